@@ -0,0 +1,218 @@
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError
+from flask import Blueprint, Response, jsonify, request
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import cache
+import methods
+import tracing
+
+BATCH_WINDOW_MS = float(os.environ.get("SUDOKU_BATCH_WINDOW_MS", "2"))
+BATCH_MAX_SIZE = int(os.environ.get("SUDOKU_BATCH_MAX_SIZE", "64"))
+API_TIMEOUT = float(os.environ.get("SUDOKU_API_TIMEOUT_S", "10"))
+API_WORKERS = int(os.environ.get("SUDOKU_API_WORKERS", "0")) or os.cpu_count() or 1
+
+TECHNIQUE_GRADES = {
+    "Naked Single": "easy",
+    "Hidden Single": "easy",
+    "Naked Pair": "medium",
+    "Naked Triple": "medium",
+    "Pointing Pair": "hard",
+    "Pointing Triple": "hard",
+    "Claiming Pair": "hard",
+    "Claiming Triple": "hard",
+    "Pointing Quad": "hard",
+    "Pointing Quint": "hard",
+    "Claiming Quad": "hard",
+    "Claiming Quint": "hard",
+    "Simple Coloring": "expert",
+    "XY-Wing": "expert",
+}
+GRADES = ["easy", "medium", "hard", "expert"]
+
+blueprint = Blueprint("api", __name__, url_prefix="/api")
+
+
+def solve(payload: dict) -> dict:
+    board = payload.get("board")
+    methods.validate_board(board)
+    trace = cache.solve_trace(board)
+    return {
+        "solved": trace["solved"],
+        "board": trace["board"],
+        "steps": trace["steps"],
+    }
+
+
+def hint(payload: dict) -> dict:
+    step = methods.hint(payload.get("board"), payload.get("candidates"))
+    return {"step": None if step is None else dict(step)}
+
+
+def grade(payload: dict) -> dict:
+    """Grades a board by the hardest technique its solution needs: "easy",
+    "medium", "hard" or "expert" (see `TECHNIQUE_GRADES`). A board that is
+    already complete grades "solved", and one the techniques cannot finish
+    grades "unsolved"."""
+    result = solve(payload)
+    techniques = {}
+    for step in result["steps"]:
+        techniques[step["name"]] = techniques.get(step["name"], 0) + 1
+    if not result["solved"]:
+        level = "unsolved"
+    elif len(techniques) == 0:
+        level = "solved"
+    else:
+        level = max(
+            (TECHNIQUE_GRADES.get(name, "expert") for name in techniques),
+            key=GRADES.index,
+        )
+    return {"grade": level, "solved": result["solved"], "techniques": techniques}
+
+
+def validate(payload: dict) -> dict:
+    board = payload.get("board")
+    try:
+        methods.validate_board(board, payload.get("candidates"))
+    except ValueError as error:
+        return {"valid": False, "unique": False, "error": str(error), "solutions": 0}
+    solutions = methods.count_solutions(board)
+    if solutions is None:
+        return {
+            "valid": None,
+            "unique": None,
+            "error": "search timed out, solution count unknown",
+            "solutions": None,
+        }
+    return {
+        "valid": solutions > 0,
+        "unique": solutions == 1,
+        "error": None if solutions > 0 else "board has no solution",
+        "solutions": solutions,
+    }
+
+
+HANDLERS = {"solve": solve, "hint": hint, "grade": grade, "validate": validate}
+
+
+def run_batch(
+    name: str, payloads: list[dict]
+) -> tuple[list[tuple[bool, object, float]], tracing.capture]:
+    """Runs one batch in a pool process. Returns the results along with the
+    spans and counters recorded meanwhile, which only reach /metrics once the
+    parent replays them. A payload whose handler raises gets the error as its
+    own result, so it does not fail the rest of the batch."""
+    results = []
+    handler = HANDLERS[name]
+    with tracing.capture() as captured:
+        for payload in payloads:
+            start = time.perf_counter()
+            try:
+                results.append((True, handler(payload), time.perf_counter() - start))
+            except ValueError as error:
+                results.append((False, str(error), time.perf_counter() - start))
+            except Exception as error:
+                message = f"{type(error).__name__}: {error}"
+                results.append((False, message, time.perf_counter() - start))
+    return results, captured
+
+
+class MicroBatcher:
+    """Groups requests that arrive within `window` seconds of each other and
+    runs each group as one task on the executor. A request whose future is
+    cancelled before its group is dispatched is dropped; once dispatched it
+    runs to completion with the rest of its group."""
+
+    def __init__(self, executor, window: float, max_size: int):
+        self.executor = executor
+        self.window = window
+        self.max_size = max_size
+        self._queue: queue.Queue[tuple[str, dict, Future, float]] = queue.Queue()
+        threading.Thread(target=self._loop, daemon=True).start()
+
+    def submit(self, name: str, payload: dict) -> Future:
+        future = Future()
+        self._queue.put((name, payload, future, time.perf_counter()))
+        return future
+
+    def _loop(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.perf_counter() + self.window
+            while len(batch) < self.max_size:
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            groups: dict[str, list] = {}
+            for item in batch:
+                if item[2].set_running_or_notify_cancel():
+                    groups.setdefault(item[0], []).append(item)
+            for name, items in groups.items():
+                self._dispatch(name, items)
+
+    def _dispatch(self, name: str, items: list):
+        dispatched = time.perf_counter()
+        task = self.executor.submit(run_batch, name, [item[1] for item in items])
+
+        def resolve(task: Future):
+            try:
+                results, captured = task.result()
+            except Exception as error:
+                for item in items:
+                    item[2].set_exception(error)
+                return
+            tracing.replay(captured.spans, captured.counts)
+            for (_, _, future, queued), result in zip(items, results):
+                future.set_result(result + (dispatched - queued, len(items)))
+
+        task.add_done_callback(resolve)
+
+
+batcher: MicroBatcher | None = None
+batcher_lock = threading.Lock()
+
+
+def get_batcher() -> MicroBatcher:
+    global batcher
+    with batcher_lock:
+        if batcher is None:
+            executor = ProcessPoolExecutor(
+                API_WORKERS, mp_context=multiprocessing.get_context("spawn")
+            )
+            batcher = MicroBatcher(executor, BATCH_WINDOW_MS / 1000, BATCH_MAX_SIZE)
+        return batcher
+
+
+@blueprint.post("/<name>")
+def handle(name: str) -> Response:
+    start = time.perf_counter()
+    if name not in HANDLERS:
+        return jsonify({"error": f"unknown endpoint {name!r}"}), 404
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        return jsonify({"error": "request body must be a JSON object"}), 400
+    future = get_batcher().submit(name, payload)
+    try:
+        ok, result, compute, queued, batch_size = future.result(timeout=API_TIMEOUT)
+    except TimeoutError:
+        # Only drops the request if it is still queued; a dispatched batch is
+        # shared with other requests and keeps running in the pool.
+        future.cancel()
+        return jsonify({"error": "request timed out"}), 503
+    response = jsonify(result if ok else {"error": result})
+    if not ok:
+        response.status_code = 400
+    total = time.perf_counter() - start
+    response.headers["Server-Timing"] = (
+        f"queue;dur={queued * 1e3:.3f}, "
+        f"compute;dur={compute * 1e3:.3f}, "
+        f"total;dur={total * 1e3:.3f}"
+    )
+    response.headers["X-Batch-Size"] = str(batch_size)
+    return response
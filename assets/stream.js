@@ -0,0 +1,83 @@
+// Follows /stream/solve while the trace in the sudoku-data store is still
+// being computed, appending each batch of steps to the store as it arrives
+// so the user can step through the solution before it is complete.
+(function () {
+    let current = null;
+    let latest = null;
+
+    function publish() {
+        if (latest === null || latest.stream !== current.key) {
+            return;
+        }
+        latest = Object.assign({}, latest, {
+            steps: current.steps,
+            stream: current.done ? null : current.key,
+        });
+        dash_clientside.set_props("sudoku-data", { data: latest });
+        dash_clientside.set_props("step-index-slider", {
+            max: current.steps.length,
+        });
+    }
+
+    function open(stream) {
+        const url =
+            "stream/solve?puzzle=" +
+            encodeURIComponent(stream.key) +
+            "&start=" +
+            stream.steps.length;
+        stream.source = new EventSource(url);
+        stream.source.addEventListener("steps", function (event) {
+            stream.steps = stream.steps.concat(JSON.parse(event.data));
+            if (stream === current) {
+                publish();
+            }
+        });
+        stream.source.addEventListener("done", function () {
+            stream.source.close();
+            stream.done = true;
+            if (stream === current) {
+                publish();
+            }
+        });
+        stream.source.onerror = function () {
+            // Reconnect ourselves so the request resumes after the steps
+            // already received instead of replaying them.
+            stream.source.close();
+            if (stream === current && !stream.done) {
+                setTimeout(function () {
+                    if (stream === current && !stream.done) {
+                        open(stream);
+                    }
+                }, 1000);
+            }
+        };
+    }
+
+    function follow(data) {
+        latest = data;
+        if (!data || !data.stream) {
+            if (current !== null && !current.done) {
+                current.source.close();
+                current = null;
+            }
+            return;
+        }
+        if (current === null || current.key !== data.stream) {
+            if (current !== null && !current.done) {
+                current.source.close();
+            }
+            current = { key: data.stream, steps: data.steps, done: false };
+            open(current);
+            return;
+        }
+        // A server callback answered with a store from before some batches
+        // (or before the end of the stream) arrived.
+        if (data.steps.length < current.steps.length || current.done) {
+            publish();
+        }
+    }
+
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {
+        stream: { follow: follow },
+    });
+})();
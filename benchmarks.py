@@ -0,0 +1,528 @@
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import urllib.request
+import cache
+import methods
+import tracing
+from step_log import StepLog
+
+
+def timed(function, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def sample_trace(puzzles: int, length: int) -> list:
+    steps = []
+    for _ in range(puzzles):
+        sudoku = methods.SudokuManager()
+        sudoku.logic_solve()
+        steps.extend(sudoku.steps.to_list())
+    return (steps * (length // len(steps) + 1))[:length]
+
+
+def bench_steps(args: argparse.Namespace):
+    trace = sample_trace(args.puzzles, args.length)
+
+    def build_list():
+        steps = []
+        for step in trace:
+            steps.append(dict(step))
+        return steps
+
+    def build_log():
+        return StepLog(trace)
+
+    def iterate(steps):
+        for step in steps:
+            step["type"], step["name"], step["candidates_removed_positions"]
+            if step["type"] == "fill":
+                step["position"], step["digit"]
+            else:
+                step["positions"], step["removed_digits"]
+
+    tracemalloc.start()
+    as_list = [
+        {
+            key: [tuple(pos) for pos in value] if isinstance(value, list) else value
+            for key, value in step.items()
+        }
+        for step in trace
+    ]
+    list_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    tracemalloc.start()
+    as_log = StepLog(trace)
+    log_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    rows = [
+        ("bytes/step", list_bytes / len(trace), log_bytes / len(trace)),
+        ("append (ms)", timed(build_list) * 1e3, timed(build_log) * 1e3),
+        (
+            "iterate (ms)",
+            timed(lambda: iterate(as_list)) * 1e3,
+            timed(lambda: iterate(as_log)) * 1e3,
+        ),
+        (
+            "serialize (ms)",
+            timed(lambda: json.dumps(as_list)) * 1e3,
+            timed(lambda: as_log.to_json()) * 1e3,
+        ),
+    ]
+    print(f"{len(trace)} steps")
+    print(f"{'':16}{'list[dict]':>12}{'StepLog':>12}")
+    for label, before, after in rows:
+        print(f"{label:16}{before:12.1f}{after:12.1f}")
+
+
+def percentile(samples: list[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def int_list(value: str) -> list[int]:
+    return [int(item) for item in value.split(",")]
+
+
+def float_list(value: str) -> list[float]:
+    return [float(item) for item in value.split(",")]
+
+
+def bench_hint(args: argparse.Namespace):
+    boards = []
+    for _ in range(args.puzzles):
+        sudoku = methods.SudokuManager()
+        sudoku.logic_solve()
+        steps = sudoku.steps.to_list()
+        reversible = methods.ReversibleBoard(sudoku.puzzle)
+        for applied in range(len(steps)):
+            reversible.seek(steps, applied)
+            candidates = reversible.snapshot()
+            board = [
+                [cell if isinstance(cell, int) else None for cell in row]
+                for row in candidates
+            ]
+            boards.append((board, candidates))
+    for label, with_candidates in (("board only", False), ("with candidates", True)):
+        samples = []
+        for board, candidates in boards:
+            start = time.perf_counter()
+            methods.hint(board, candidates if with_candidates else None)
+            samples.append(time.perf_counter() - start)
+        print(
+            f"{label:16} n={len(samples)}"
+            f" p50={percentile(samples, 0.5) * 1e3:.3f}ms"
+            f" p99={percentile(samples, 0.99) * 1e3:.3f}ms"
+            f" max={max(samples) * 1e3:.3f}ms"
+        )
+
+
+def bench_tracing(args: argparse.Namespace):
+    def spans():
+        for _ in range(args.spans):
+            with tracing.span("bench", "empty"):
+                pass
+
+    def traced_calls():
+        function = tracing.traced("bench")(lambda: None)
+        for _ in range(args.spans):
+            function()
+
+    for label, function in (("span", spans), ("traced", traced_calls)):
+        per_span = timed(function) / args.spans
+        print(f"{label:8} {per_span * 1e9:.0f}ns per span")
+
+
+COLD_START_SCRIPT = """
+import json, resource, time
+start = time.perf_counter()
+import {module}
+imported = time.perf_counter()
+first_response = None
+if "{module}" == "main":
+    client = main.server.test_client()
+    for path in ("/", "/_dash-layout", "/_dash-dependencies"):
+        client.get(path)
+    first_response = time.perf_counter() - start
+print(json.dumps({{
+    "import": imported - start,
+    "first_response": first_response,
+    "max_rss": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+}}))
+"""
+
+
+def bench_coldstart(args: argparse.Namespace):
+    env = {
+        key: value
+        for key, value in os.environ.items()
+        if key != "PYTHONDONTWRITEBYTECODE"
+    }
+    for module in ("methods", "main"):
+        script = COLD_START_SCRIPT.format(module=module)
+        runs = []
+        for _ in range(args.runs + 1):
+            output = subprocess.run(
+                [sys.executable, "-c", script],
+                capture_output=True,
+                check=True,
+                env=env,
+                text=True,
+            ).stdout
+            runs.append(json.loads(output.splitlines()[-1]))
+        runs = runs[1:]
+        line = f"{module:8} import={min(run['import'] for run in runs) * 1e3:.1f}ms"
+        if runs[0]["first_response"] is not None:
+            first_response = min(run["first_response"] for run in runs)
+            line += f" first_response={first_response * 1e3:.1f}ms"
+        line += f" max_rss={min(run['max_rss'] for run in runs) / 1024:.1f}MB"
+        print(line)
+
+
+def memory_rollup(pid: int) -> dict[str, int]:
+    """RSS, PSS and USS (private pages) of a process in kB, from
+    /proc/<pid>/smaps_rollup (Linux only)."""
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as rollup:
+        for line in rollup:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1])
+    return {
+        "rss": fields["Rss"],
+        "pss": fields["Pss"],
+        "uss": fields["Private_Clean"] + fields["Private_Dirty"],
+    }
+
+
+def bench_workers(args: argparse.Namespace):
+    root = os.path.dirname(os.path.abspath(__file__))
+    for preload in ("1", "0"):
+        port = args.port
+        env = os.environ | {
+            "SUDOKU_BIND": f"127.0.0.1:{port}",
+            "SUDOKU_WORKERS": str(args.workers),
+            "SUDOKU_PRELOAD": preload,
+            "SUDOKU_PUZZLE_POOL_SIZE": "0",
+            "SUDOKU_RENDER_PREFETCH": "0",
+            "SUDOKU_CACHE_PATH": os.path.join(tempfile.mkdtemp(), "cache.sqlite3"),
+        }
+        master = subprocess.Popen(
+            [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py"],
+            cwd=root,
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            children_path = f"/proc/{master.pid}/task/{master.pid}/children"
+            deadline = time.time() + 60
+            while True:
+                with open(children_path) as children:
+                    workers = [int(pid) for pid in children.read().split()]
+                if len(workers) == args.workers:
+                    try:
+                        for _ in range(args.requests):
+                            for path in ("/", "/_dash-layout", "/_dash-dependencies"):
+                                urllib.request.urlopen(
+                                    f"http://127.0.0.1:{port}{path}"
+                                ).read()
+                        break
+                    except OSError:
+                        pass
+                if time.time() > deadline:
+                    raise RuntimeError("gunicorn did not start")
+                time.sleep(0.2)
+            time.sleep(1)
+            usage = [memory_rollup(pid) for pid in workers]
+            total = memory_rollup(master.pid)["pss"] + sum(
+                worker["pss"] for worker in usage
+            )
+            line = f"preload={preload} workers={args.workers}"
+            for field in ("rss", "pss", "uss"):
+                mean = sum(worker[field] for worker in usage) / len(usage)
+                line += f" {field}/worker={mean / 1024:.1f}MB"
+            print(f"{line} total_pss={total / 1024:.1f}MB")
+        finally:
+            master.terminate()
+            master.wait()
+
+
+def shuffled_puzzle(board: list, rng: random.Random) -> list:
+    digits = list(range(1, 10))
+    rng.shuffle(digits)
+    rows = [
+        band * 3 + row
+        for band in rng.sample(range(3), 3)
+        for row in rng.sample(range(3), 3)
+    ]
+    cols = [
+        stack * 3 + col
+        for stack in rng.sample(range(3), 3)
+        for col in rng.sample(range(3), 3)
+    ]
+    shuffled = [[board[y][x] for x in cols] for y in rows]
+    if rng.random() < 0.5:
+        shuffled = [list(row) for row in zip(*shuffled)]
+    return [
+        [None if cell is None else digits[cell - 1] for cell in row] for row in shuffled
+    ]
+
+
+def bench_canonical(args: argparse.Namespace):
+    rng = random.Random(args.seed)
+    corpus = []
+    for _ in range(args.puzzles):
+        puzzle = methods.SudokuManager().puzzle
+        corpus.append(puzzle)
+        corpus.extend(shuffled_puzzle(puzzle, rng) for _ in range(args.variants))
+    rng.shuffle(corpus)
+
+    start = time.perf_counter()
+    for board in corpus:
+        sudoku = methods.SudokuManager(board)
+        sudoku.logic_solve()
+        sudoku.steps.to_list()
+    uncached = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as directory:
+        cache.shared_cache = cache.SharedCache(os.path.join(directory, "cache.sqlite3"))
+        start = time.perf_counter()
+        for board in corpus:
+            cache.solve_trace(board)
+        cached = time.perf_counter() - start
+        cache.shared_cache = None
+
+    hits = tracing.counters.get("sudoku_trace_cache_hits_total", 0)
+    misses = tracing.counters.get("sudoku_trace_cache_misses_total", 0)
+    canonicalize = tracing.recorder.series[("cache", "canonicalize")]
+    print(f"{len(corpus)} puzzles, {args.puzzles} distinct up to symmetry")
+    print(f"hit rate       {hits / (hits + misses):.1%} ({hits} hits, {misses} misses)")
+    print(
+        f"canonicalize   {canonicalize.duration_sum / canonicalize.duration_count * 1e3:.2f}ms mean"
+    )
+    print(f"solve          {uncached / len(corpus) * 1e3:.2f}ms mean")
+    print(f"uncached       {uncached * 1e3:.0f}ms")
+    print(
+        f"cached         {cached * 1e3:.0f}ms ({(uncached - cached) / uncached:.1%} saved)"
+    )
+
+
+def pattern_puzzle(box: int, givens: float, rng: random.Random) -> tuple[list, list]:
+    """Shuffles a pattern-filled grid, clears cells at random and restores
+    clues until the logical solver can finish it."""
+    size = box * box
+    bands = rng.sample(range(box), box)
+    rows = [band * box + row for band in bands for row in rng.sample(range(box), box)]
+    stacks = rng.sample(range(box), box)
+    cols = [
+        stack * box + col for stack in stacks for col in rng.sample(range(box), box)
+    ]
+    digits = rng.sample(range(1, size + 1), size)
+    solution = [
+        [digits[(box * (y % box) + y // box + x) % size] for x in cols] for y in rows
+    ]
+    puzzle = [
+        [cell if rng.random() < givens else None for cell in row] for row in solution
+    ]
+    while True:
+        sudoku = methods.SudokuManager(puzzle)
+        sudoku.logic_solve()
+        stuck = [
+            (y, x)
+            for y, row in enumerate(sudoku.board)
+            for x, cell in enumerate(row)
+            if isinstance(cell, list)
+        ]
+        if len(stuck) == 0:
+            return puzzle, solution
+        y, x = rng.choice(stuck)
+        puzzle[y][x] = solution[y][x]
+
+
+def bench_sizes(args: argparse.Namespace):
+    rng = random.Random(args.seed)
+    print(f"{args.puzzles} puzzles per size, {args.givens:.0%} givens before repair")
+    print(f"{'size':>6}{'givens':>8}{'steps':>8}{'p50 ms':>10}{'p99 ms':>10}")
+    for box in args.boxes:
+        samples = []
+        steps = 0
+        givens = 0
+        for _ in range(args.puzzles):
+            puzzle, solution = pattern_puzzle(box, args.givens, rng)
+            sudoku = methods.SudokuManager(puzzle)
+            start = time.perf_counter()
+            sudoku.logic_solve()
+            samples.append(time.perf_counter() - start)
+            assert sudoku.board == solution
+            steps += len(sudoku.steps)
+            givens += sum(cell is not None for row in puzzle for cell in row)
+        size = box * box
+        print(
+            f"{f'{size}x{size}':>6}{givens / args.puzzles / size**2:>8.0%}"
+            f"{steps / args.puzzles:>8.0f}"
+            f"{percentile(samples, 0.5) * 1e3:>10.1f}"
+            f"{percentile(samples, 0.99) * 1e3:>10.1f}"
+        )
+
+
+def bench_waves(args: argparse.Namespace):
+    traces = {False: [], True: []}
+    for _ in range(args.puzzles):
+        puzzle = methods.SudokuManager().puzzle
+        for waves in traces:
+            sudoku = methods.SudokuManager(puzzle, waves)
+            sudoku.logic_solve()
+            traces[waves].append((sudoku.puzzle, sudoku.steps.to_list()))
+
+    stores = {
+        waves: [
+            json.dumps({"puzzle": puzzle, "steps": steps}) for puzzle, steps in trace
+        ]
+        for waves, trace in traces.items()
+    }
+
+    def replay(waves):
+        boards = []
+        for puzzle, steps in traces[waves]:
+            board = methods.ReversibleBoard(puzzle)
+            board.seek(steps, len(steps))
+            boards.append(board.board)
+        return boards
+
+    def decode_and_replay(waves):
+        # What a Dash callback pays: the store arrives as JSON every time.
+        for store in stores[waves]:
+            data = json.loads(store)
+            board = methods.ReversibleBoard(data["puzzle"])
+            board.seek(data["steps"], len(data["steps"]))
+
+    assert replay(False) == replay(True)
+    rows = [
+        (
+            "steps",
+            *(sum(len(steps) for _, steps in traces[waves]) for waves in traces),
+        ),
+        ("json (KB)", *(sum(map(len, stores[waves])) / 1024 for waves in traces)),
+        ("replay (ms)", *(timed(lambda: replay(waves)) * 1e3 for waves in traces)),
+        (
+            "decode+replay",
+            *(timed(lambda: decode_and_replay(waves)) * 1e3 for waves in traces),
+        ),
+    ]
+    print(f"{args.puzzles} puzzles")
+    print(f"{'':16}{'singles':>12}{'waves':>12}")
+    for label, before, after in rows:
+        print(f"{label:16}{before:12.1f}{after:12.1f}")
+
+
+def bench_render(args: argparse.Namespace):
+    import main as app
+
+    app.RENDER_PREFETCH = False
+    sudoku = methods.SudokuManager(waves=True)
+    sudoku.logic_solve()
+    steps = sudoku.steps.to_list()
+    data = json.loads(
+        json.dumps(
+            {
+                "puzzle": sudoku.puzzle,
+                "board": sudoku.puzzle,
+                "steps": steps,
+                "step_index": -1,
+                "stream": None,
+            }
+        )
+    )
+    # Forward through the trace, then back and forth as a user would.
+    path = list(range(-1, len(steps)))
+    path += path[::-1] * args.passes
+    for label, max_bytes in (("uncached", 0), ("cached", cache.RENDER_CACHE_BYTES)):
+        app.render_cache = cache.RenderCache(max_bytes)
+        samples = []
+        for index in path:
+            start = time.perf_counter()
+            app.cached_view({**data, "step_index": index}, True)
+            samples.append(time.perf_counter() - start)
+        print(
+            f"{label:10} n={len(samples)}"
+            f" p50={percentile(samples, 0.5) * 1e3:.3f}ms"
+            f" p99={percentile(samples, 0.99) * 1e3:.3f}ms"
+            f" total={sum(samples) * 1e3:.0f}ms"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sudoku Assistant benchmarks")
+    subparsers = parser.add_subparsers(required=True)
+
+    steps_parser = subparsers.add_parser("steps", help="step log memory and speed")
+    steps_parser.add_argument("--puzzles", type=int, default=3)
+    steps_parser.add_argument("--length", type=int, default=10_000)
+    steps_parser.set_defaults(run=bench_steps)
+
+    hint_parser = subparsers.add_parser("hint", help="next-hint latency")
+    hint_parser.add_argument("--puzzles", type=int, default=10)
+    hint_parser.set_defaults(run=bench_hint)
+
+    tracing_parser = subparsers.add_parser("tracing", help="span overhead")
+    tracing_parser.add_argument("--spans", type=int, default=100_000)
+    tracing_parser.set_defaults(run=bench_tracing)
+
+    coldstart_parser = subparsers.add_parser("coldstart", help="import and startup")
+    coldstart_parser.add_argument("--runs", type=int, default=5)
+    coldstart_parser.set_defaults(run=bench_coldstart)
+
+    workers_parser = subparsers.add_parser(
+        "workers", help="memory per gunicorn worker with and without preload"
+    )
+    workers_parser.add_argument("--workers", type=int, default=4)
+    workers_parser.add_argument("--requests", type=int, default=20)
+    workers_parser.add_argument("--port", type=int, default=8061)
+    workers_parser.set_defaults(run=bench_workers)
+
+    canonical_parser = subparsers.add_parser(
+        "canonical", help="fingerprinted solve cache hit rate"
+    )
+    canonical_parser.add_argument("--puzzles", type=int, default=10)
+    canonical_parser.add_argument("--variants", type=int, default=9)
+    canonical_parser.add_argument("--seed", type=int, default=0)
+    canonical_parser.set_defaults(run=bench_canonical)
+
+    sizes_parser = subparsers.add_parser("sizes", help="solve time per grid size")
+    sizes_parser.add_argument("--boxes", type=int_list, default=[3, 4, 5])
+    sizes_parser.add_argument("--puzzles", type=int, default=10)
+    sizes_parser.add_argument("--givens", type=float, default=0.45)
+    sizes_parser.add_argument("--seed", type=int, default=0)
+    sizes_parser.set_defaults(run=bench_sizes)
+
+    waves_parser = subparsers.add_parser(
+        "waves", help="trace size and replay with naked single waves"
+    )
+    waves_parser.add_argument("--puzzles", type=int, default=20)
+    waves_parser.set_defaults(run=bench_waves)
+
+    render_parser = subparsers.add_parser(
+        "render", help="board render time with and without the view cache"
+    )
+    render_parser.add_argument("--passes", type=int, default=4)
+    render_parser.set_defaults(run=bench_render)
+
+    args = parser.parse_args()
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,350 @@
+from collections import OrderedDict
+from collections.abc import Hashable, Iterator
+import json
+from math import isqrt
+import os
+import sqlite3
+import threading
+import time
+from canonical import Transform, canonicalize
+import methods
+import tracing
+from type_defs import Board
+
+CACHE_PATH = os.environ.get(
+    "SUDOKU_CACHE_PATH",
+    os.path.join(
+        os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")),
+        "sudoku-assistant",
+        "cache.sqlite3",
+    ),
+)
+TRACE_CACHE_ROWS = int(os.environ.get("SUDOKU_TRACE_CACHE_ROWS", "10000"))
+# Bump whenever the solver, the step format or the canonical form changes,
+# so traces written by an older version are never served.
+TRACE_VERSION = 1
+PUZZLE_POOL_SIZE = int(os.environ.get("SUDOKU_PUZZLE_POOL_SIZE", "8"))
+RENDER_CACHE_BYTES = int(os.environ.get("SUDOKU_RENDER_CACHE_MB", "32")) * 2**20
+STREAM_INTERVAL = float(os.environ.get("SUDOKU_STREAM_INTERVAL_MS", "100")) / 1e3
+DIGIT_CHARS = ".123456789ABCDEFGHIJKLMNOP"
+BOARD_SIZES = [box * box for box in methods.BOX_SIZES]
+KEY_LENGTHS = [size * size for size in BOARD_SIZES]
+
+
+def board_key(board: Board) -> str:
+    return "".join(
+        DIGIT_CHARS[cell] if isinstance(cell, int) else "."
+        for row in board
+        for cell in row
+    )
+
+
+def parse_board_key(key: str) -> Board:
+    size = isqrt(len(key))
+    if size * size != len(key) or size not in BOARD_SIZES:
+        raise ValueError(
+            f"board key must have {', '.join(map(str, KEY_LENGTHS[:-1]))}"
+            f" or {KEY_LENGTHS[-1]} characters, not {len(key)}"
+        )
+    for char in key:
+        if char not in DIGIT_CHARS[: size + 1]:
+            raise ValueError(f"invalid character {char!r} in board key")
+    return [
+        [DIGIT_CHARS.index(char) or None for char in key[y * size : (y + 1) * size]]
+        for y in range(size)
+    ]
+
+
+class SharedCache:
+    """Solved traces and a pool of ready-to-serve puzzles kept in a SQLite
+    file in WAL mode, so every worker process on the host shares them.
+
+    Traces are keyed by canonical fingerprint and stored in canonical
+    coordinates, so all puzzles equivalent under the sudoku symmetries share
+    one entry; pooled puzzles are kept as their own givens. Each solver
+    version has its own traces table, holding the `max_traces` most recently
+    written traces. Tables of other versions are left to the workers still
+    running them, until `drop_other_versions` is called."""
+
+    def __init__(self, path: str, max_traces: int = TRACE_CACHE_ROWS):
+        self.path = path
+        self.max_traces = max_traces
+        self.table = f"traces_v{TRACE_VERSION}"
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path) or ".", mode=0o700, exist_ok=True)
+        self._create_tables()
+
+    def _create_tables(self):
+        connection = self._connection()
+        connection.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.table}"
+            " (key TEXT PRIMARY KEY, value TEXT)"
+        )
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS pool"
+            " (id INTEGER PRIMARY KEY AUTOINCREMENT, key TEXT)"
+        )
+
+    def drop_other_versions(self) -> list[str]:
+        """Drops the traces tables of every other solver version. Run it once
+        no worker of an older version is left; returns the dropped tables."""
+        connection = self._connection()
+        stale = connection.execute(
+            "SELECT name FROM sqlite_master"
+            " WHERE type = 'table' AND name LIKE 'traces%' AND name != ?",
+            (self.table,),
+        ).fetchall()
+        for (name,) in stale:
+            connection.execute(f'DROP TABLE "{name}"')
+        return [name for (name,) in stale]
+
+    def _execute(self, sql: str, parameters: tuple = ()) -> sqlite3.Cursor:
+        """Runs `sql`, recreating the tables once if another process dropped
+        them (e.g. a newer version's `drop_other_versions`)."""
+        try:
+            return self._connection().execute(sql, parameters)
+        except sqlite3.OperationalError as error:
+            if "no such table" not in str(error):
+                raise
+            self._create_tables()
+            return self._connection().execute(sql, parameters)
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def close(self):
+        """Closes the calling thread's connection."""
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+    def get_trace(self, key: str) -> dict | None:
+        row = self._execute(
+            f"SELECT value FROM {self.table} WHERE key = ?", (key,)
+        ).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def put_trace(self, key: str, value: str):
+        """Stores `value`, a trace already serialized to JSON."""
+        rowid = self._execute(
+            f"INSERT OR REPLACE INTO {self.table} (key, value) VALUES (?, ?)",
+            (key, value),
+        ).lastrowid
+        # Rewritten rows get a new rowid, so rowids order rows by last write.
+        self._execute(
+            f"DELETE FROM {self.table} WHERE rowid <= ?", (rowid - self.max_traces,)
+        )
+
+    def push_puzzle(self, key: str):
+        self._execute("INSERT INTO pool (key) VALUES (?)", (key,))
+
+    def pop_puzzle(self) -> str | None:
+        row = self._execute(
+            "DELETE FROM pool WHERE id = (SELECT MIN(id) FROM pool) RETURNING key"
+        ).fetchone()
+        return None if row is None else row[0]
+
+    def pool_size(self) -> int:
+        return self._execute("SELECT COUNT(*) FROM pool").fetchone()[0]
+
+
+class RenderCache:
+    """In-process LRU of rendered views, bounded by the total size of their
+    serialized JSON rather than by their number."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._entries: OrderedDict[Hashable, tuple[object, int]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def get(self, key: Hashable) -> object | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is None:
+            tracing.count("sudoku_render_cache_misses_total")
+            return None
+        tracing.count("sudoku_render_cache_hits_total")
+        return entry[0]
+
+    def put(self, key: Hashable, view: object, nbytes: int):
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.nbytes -= previous[1]
+            if nbytes > self.max_bytes:
+                return
+            self._entries[key] = (view, nbytes)
+            self.nbytes += nbytes
+            while self.nbytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.nbytes -= evicted
+                tracing.count("sudoku_render_cache_evictions_total")
+
+
+shared_cache: SharedCache | None = None
+shared_cache_lock = threading.Lock()
+pool_wakeup = threading.Event()
+pool_refiller: threading.Thread | None = None
+
+
+def get_shared_cache() -> SharedCache:
+    global shared_cache
+    with shared_cache_lock:
+        if shared_cache is None:
+            shared_cache = SharedCache(CACHE_PATH)
+        return shared_cache
+
+
+def solve_trace(board: Board, waves: bool = False) -> dict:
+    canonical, key, transform = _trace_key(board, waves)
+    trace = _get_trace(key)
+    if trace is None:
+        sudoku = methods.SudokuManager(canonical, waves)
+        sudoku.logic_solve()
+        trace = _trace(sudoku)
+        get_shared_cache().put_trace(key, _trace_json(sudoku))
+    return _to_original(trace, transform)
+
+
+def cached_trace(board: Board, waves: bool = False) -> dict | None:
+    canonical, key, transform = _trace_key(board, waves)
+    trace = _get_trace(key)
+    return None if trace is None else _to_original(trace, transform)
+
+
+def stream_trace(board: Board, waves: bool = False, start: int = 0) -> Iterator[list]:
+    """Solves like `solve_trace`, yielding the steps from `start` on in
+    batches as the solver finds them: the first as soon as there is one,
+    then at most one batch per `STREAM_INTERVAL`."""
+    canonical, key, transform = _trace_key(board, waves)
+    trace = _get_trace(key)
+    if trace is not None:
+        yield _to_original(trace, transform)["steps"][start:]
+        return
+    sudoku = methods.SudokuManager(canonical, waves)
+    sent = 0
+    flushed = float("-inf")
+    for count in sudoku.logic_solve_iter():
+        if count <= start or time.perf_counter() - flushed < STREAM_INTERVAL:
+            continue
+        yield _steps_to_original(sudoku.steps.to_list(max(sent, start)), transform)
+        sent = count
+        flushed = time.perf_counter()
+    if len(sudoku.steps) > max(sent, start):
+        yield _steps_to_original(sudoku.steps.to_list(max(sent, start)), transform)
+    get_shared_cache().put_trace(key, _trace_json(sudoku))
+
+
+def _trace_key(board: Board, waves: bool) -> tuple[Board, str, Transform | None]:
+    """Keys 9x9 puzzles by canonical form. Other sizes, complete grids (with
+    no steps to share) and grids whose canonical search grows too large are
+    keyed by their exact givens."""
+    result = None
+    if len(board) == 9 and any(cell is None for row in board for cell in row):
+        with tracing.span("cache", "canonicalize"):
+            result = canonicalize(board)
+    if result is None:
+        result = board, board_key(board), None
+    canonical, fingerprint, transform = result
+    return canonical, f"{fingerprint}:waves" if waves else fingerprint, transform
+
+
+def _get_trace(key: str) -> dict | None:
+    trace = get_shared_cache().get_trace(key)
+    if trace is None:
+        tracing.count("sudoku_trace_cache_misses_total")
+    else:
+        tracing.count("sudoku_trace_cache_hits_total")
+    return trace
+
+
+def _to_original(trace: dict, transform: Transform | None) -> dict:
+    if transform is None:
+        return trace
+    with tracing.span("cache", "map_trace", len(trace["steps"])):
+        return map_trace(trace, transform)
+
+
+def _steps_to_original(steps: list, transform: Transform | None) -> list:
+    if transform is None:
+        return steps
+    return [transform.step_to_original(step) for step in steps]
+
+
+def map_trace(trace: dict, transform: Transform) -> dict:
+    return {
+        "puzzle": transform.board_to_original(trace["puzzle"]),
+        "board": transform.board_to_original(trace["board"]),
+        "steps": [transform.step_to_original(step) for step in trace["steps"]],
+        "solved": trace["solved"],
+    }
+
+
+def new_puzzle() -> tuple[Board, dict | None]:
+    """Returns a puzzle for the app, preferring the pre-generated pool, and
+    its trace (naked single sweeps as waves) if one is cached; otherwise the
+    trace is left to `stream_trace`."""
+    _start_pool_refiller()
+    key = get_shared_cache().pop_puzzle()
+    pool_wakeup.set()
+    puzzle = methods.SudokuManager().puzzle if key is None else parse_board_key(key)
+    return puzzle, cached_trace(puzzle, waves=True)
+
+
+def _trace(sudoku: methods.SudokuManager) -> dict:
+    return {
+        "puzzle": sudoku.puzzle,
+        "board": sudoku.board,
+        "steps": sudoku.steps.to_list(),
+        "solved": _solved(sudoku),
+    }
+
+
+def _trace_json(sudoku: methods.SudokuManager) -> str:
+    """`json.dumps(_trace(sudoku))`, serializing the steps straight from the
+    step log."""
+    return (
+        f'{{"puzzle": {json.dumps(sudoku.puzzle)},'
+        f' "board": {json.dumps(sudoku.board)},'
+        f' "steps": {sudoku.steps.to_json()},'
+        f' "solved": {json.dumps(_solved(sudoku))}}}'
+    )
+
+
+def _solved(sudoku: methods.SudokuManager) -> bool:
+    return all(isinstance(cell, int) for row in sudoku.board for cell in row)
+
+
+def _start_pool_refiller():
+    global pool_refiller
+    with shared_cache_lock:
+        if pool_refiller is not None or PUZZLE_POOL_SIZE <= 0:
+            return
+        pool_refiller = threading.Thread(target=_refill_pool, daemon=True)
+        pool_refiller.start()
+
+
+def _refill_pool():
+    cache = get_shared_cache()
+    while True:
+        if cache.pool_size() >= PUZZLE_POOL_SIZE:
+            pool_wakeup.wait(timeout=5)
+            pool_wakeup.clear()
+            continue
+        puzzle = methods.SudokuManager().puzzle
+        solve_trace(puzzle, waves=True)
+        cache.push_puzzle(board_key(puzzle))
@@ -0,0 +1,277 @@
+from itertools import permutations, product
+from type_defs import Board, CandidatesBoard, Step
+
+# Search states a canonicalization may keep. Puzzles keep at most a few
+# hundred; full rows multiply them (a solved grid starts with over 20,000).
+MAX_STATES = 2048
+
+
+class Transform:
+    """Maps a puzzle onto its canonical representative and back.
+
+    Canonical cell `(y, x)` holds the cell `(rows[y], cols[x])` of the
+    source grid (the puzzle, or its transpose when `transposed`), with every
+    digit `d` relabelled to `digits[d]`.
+    """
+
+    __slots__ = ("transposed", "rows", "cols", "digits", "original_digits")
+
+    def __init__(
+        self, transposed: bool, rows: list[int], cols: list[int], digits: list[int]
+    ):
+        self.transposed = transposed
+        self.rows = rows
+        self.cols = cols
+        self.digits = digits
+        self.original_digits = [0] * 10
+        for digit, label in enumerate(digits):
+            self.original_digits[label] = digit
+
+    def position_to_original(self, y: int, x: int) -> tuple[int, int]:
+        if self.transposed:
+            return (self.cols[x], self.rows[y])
+        return (self.rows[y], self.cols[x])
+
+    def board_to_canonical(self, board: CandidatesBoard) -> CandidatesBoard:
+        return [
+            [
+                self._map_cell(board[y][x], self.digits)
+                for (y, x) in (self.position_to_original(y, x) for x in range(9))
+            ]
+            for y in range(9)
+        ]
+
+    def board_to_original(self, board: CandidatesBoard) -> CandidatesBoard:
+        original = [[None] * 9 for _ in range(9)]
+        for y in range(9):
+            for x in range(9):
+                curr_y, curr_x = self.position_to_original(y, x)
+                original[curr_y][curr_x] = self._map_cell(
+                    board[y][x], self.original_digits
+                )
+        return original
+
+    def step_to_original(self, step: Step) -> Step:
+        if step["type"] == "wave":
+            return {
+                "type": "wave",
+                "name": step["name"],
+                "positions": [
+                    self.position_to_original(y, x) for (y, x) in step["positions"]
+                ],
+                "digits": [self.original_digits[digit] for digit in step["digits"]],
+            }
+        removed_positions = [
+            self.position_to_original(y, x)
+            for (y, x) in step["candidates_removed_positions"]
+        ]
+        if step["type"] == "fill":
+            return {
+                "type": "fill",
+                "name": step["name"],
+                "position": self.position_to_original(*step["position"]),
+                "digit": self.original_digits[step["digit"]],
+                "candidates_removed_positions": removed_positions,
+            }
+        return {
+            "type": "reduce",
+            "name": step["name"],
+            "positions": [
+                self.position_to_original(y, x) for (y, x) in step["positions"]
+            ],
+            "removed_digits": sorted(
+                self.original_digits[digit] for digit in step["removed_digits"]
+            ),
+            "candidates_removed_positions": removed_positions,
+        }
+
+    @staticmethod
+    def _map_cell(cell, digits: list[int]):
+        if isinstance(cell, list):
+            return sorted(digits[digit] for digit in cell)
+        return None if cell is None else digits[cell]
+
+
+def canonicalize(
+    board: Board, max_states: int = MAX_STATES
+) -> tuple[Board, str, Transform] | None:
+    """Returns the minimal grid, reading row by row with empty cells as 0,
+    over transposition, band/row and stack/column permutations and digit
+    relabelling, together with its fingerprint and the transform to it, or
+    None when the search would keep more than `max_states` states.
+
+    Columns whose order is not yet forced by the rows placed so far are kept
+    together in ordered blocks, so the search branches only on row choices,
+    stack orders and the order of newly labelled digits."""
+    grids = (
+        [[cell or 0 for cell in row] for row in board],
+        [[board[y][x] or 0 for y in range(9)] for x in range(9)],
+    )
+    best_key, states = _first_states(grids, max_states)
+    if states is None:
+        return None
+    canonical_rows = [list(best_key)]
+    for level in range(1, 9):
+        best_key = None
+        winners = []
+        for state in states:
+            grid = grids[state[0]]
+            seen = set()
+            for row in _next_rows(state[1], level):
+                values = grid[row]
+                # Rows of one band holding the same values are interchangeable.
+                if (row // 3, tuple(values)) in seen:
+                    continue
+                seen.add((row // 3, tuple(values)))
+                key = _row_key(values, state[2], state[3])
+                if best_key is not None and key > best_key:
+                    continue
+                if best_key is None or key < best_key:
+                    best_key = key
+                    winners = []
+                winners.append((state, row))
+        next_states = {}
+        for (transposed, rows, blocks, labels), row in winners:
+            values = grids[transposed][row]
+            for new_blocks, new_labels in _refine(values, blocks, labels):
+                next_states[(transposed, rows + (row,), new_blocks, new_labels)] = None
+            if len(next_states) > max_states:
+                return None
+        canonical_rows.append(list(best_key))
+        states = list(next_states)
+    transposed, rows, blocks, labels = states[0]
+    cols = [col for stack in blocks for block in stack for col in block]
+    digits = list(labels)
+    unused = iter(label for label in range(1, 10) if label not in labels)
+    for digit in range(1, 10):
+        if digits[digit] == 0:
+            digits[digit] = next(unused)
+    canonical = [[cell or None for cell in row] for row in canonical_rows]
+    fingerprint = "".join(
+        str(cell) if cell else "." for row in canonical_rows for cell in row
+    )
+    return canonical, fingerprint, Transform(transposed, list(rows), cols, digits)
+
+
+def _first_states(grids, max_states: int) -> tuple[tuple[int, ...], list | None]:
+    """Places the first row. With no digits labelled yet its key only depends
+    on how many givens fall in each stack, and is smallest with the emptiest
+    stacks first, so only those stack orders are tried."""
+    best_counts = None
+    candidates = []
+    for transposed, grid in enumerate(grids):
+        seen = set()
+        for row in range(9):
+            values = grid[row]
+            if (row // 3, tuple(values)) in seen:
+                continue
+            seen.add((row // 3, tuple(values)))
+            counts = [
+                sum(1 for col in range(stack * 3, stack * 3 + 3) if values[col])
+                for stack in range(3)
+            ]
+            if best_counts is not None and sorted(counts) > best_counts:
+                continue
+            if best_counts is None or sorted(counts) < best_counts:
+                best_counts = sorted(counts)
+                candidates = []
+            candidates.append((bool(transposed), row, counts))
+    best_key = None
+    states = {}
+    labels = (0,) * 10
+    for transposed, row, counts in candidates:
+        values = grids[transposed][row]
+        for stacks in permutations(range(3)):
+            if [counts[stack] for stack in stacks] != best_counts:
+                continue
+            blocks = tuple(
+                (tuple(range(stack * 3, stack * 3 + 3)),) for stack in stacks
+            )
+            best_key = best_key or _row_key(values, blocks, labels)
+            for new_blocks, new_labels in _refine(values, blocks, labels):
+                states[(transposed, (row,), new_blocks, new_labels)] = None
+                if len(states) > max_states:
+                    return best_key, None
+    return best_key, list(states)
+
+
+def _next_rows(rows: tuple[int, ...], level: int) -> list[int]:
+    if level % 3 == 0:
+        used_bands = {row // 3 for row in rows}
+        return [row for row in range(9) if row // 3 not in used_bands]
+    band = rows[-1] // 3
+    return [row for row in range(band * 3, band * 3 + 3) if row not in rows]
+
+
+def _row_key(values: list[int], blocks, labels: tuple[int, ...]) -> tuple[int, ...]:
+    key = []
+    next_label = max(labels) + 1
+    for stack in blocks:
+        for block in stack:
+            if len(block) == 1:
+                digit = values[block[0]]
+                if digit == 0 or labels[digit]:
+                    key.append(labels[digit])
+                else:
+                    key.append(next_label)
+                    next_label += 1
+                continue
+            zeros = 0
+            labelled = []
+            unlabelled = 0
+            for col in block:
+                digit = values[col]
+                if digit == 0:
+                    zeros += 1
+                elif labels[digit]:
+                    labelled.append(labels[digit])
+                else:
+                    unlabelled += 1
+            key.extend([0] * zeros)
+            key.extend(sorted(labelled))
+            key.extend(range(next_label, next_label + unlabelled))
+            next_label += unlabelled
+    return tuple(key)
+
+
+def _refine(values: list[int], blocks, labels: tuple[int, ...]):
+    """Yields every way of splitting `blocks` by this row's values that
+    produces its minimal key, with the digit labels each way implies."""
+    stacks = []
+    for stack in blocks:
+        splits = []
+        for block in stack:
+            if len(block) == 1:
+                splits.append(((block,),))
+                continue
+            zeros = tuple(col for col in block if values[col] == 0)
+            labelled = sorted(
+                (col for col in block if values[col] and labels[values[col]]),
+                key=lambda col: labels[values[col]],
+            )
+            unlabelled = [
+                col for col in block if values[col] and not labels[values[col]]
+            ]
+            head = ((zeros,) if zeros else ()) + tuple((col,) for col in labelled)
+            splits.append(
+                [
+                    head + tuple((col,) for col in order)
+                    for order in permutations(unlabelled)
+                ]
+            )
+        stacks.append(
+            [
+                tuple(piece for split in choice for piece in split)
+                for choice in product(*splits)
+            ]
+        )
+    for new_blocks in product(*stacks):
+        new_labels = list(labels)
+        next_label = max(labels) + 1
+        for stack in new_blocks:
+            for piece in stack:
+                digit = values[piece[0]]
+                if digit and new_labels[digit] == 0:
+                    new_labels[digit] = next_label
+                    next_label += 1
+        yield new_blocks, tuple(new_labels)
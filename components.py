@@ -1,18 +1,27 @@
 from dash import html
+from math import isqrt
+import methods
 import type_defs
 
+# Cell width, digit font size and candidate font size in pixels per grid size.
+CELL_METRICS = {4: (56, 28, 14), 9: (40, 24, 10), 16: (36, 18, 7), 25: (44, 18, 7)}
+
 
 def sudoku_table(
     data: type_defs.SudokuData | None, view_board_details: bool
 ) -> html.Table:
+    size = 9 if data is None else len(data["board"])
     return html.Table(
         [
             html.Tbody(
                 [
                     html.Tr(
-                        [sudoku_cell(data, y, x, view_board_details) for x in range(9)]
+                        [
+                            sudoku_cell(data, y, x, view_board_details, size)
+                            for x in range(size)
+                        ]
                     )
-                    for y in range(9)
+                    for y in range(size)
                 ]
             )
         ],
@@ -25,16 +34,22 @@ def sudoku_table(
 
 
 def sudoku_cell(
-    data: type_defs.SudokuData | None, y: int, x: int, view_board_details: bool
+    data: type_defs.SudokuData | None,
+    y: int,
+    x: int,
+    view_board_details: bool,
+    size: int = 9,
 ):
+    box = isqrt(size)
+    width, font_size, _ = CELL_METRICS[size]
     style = {
-        "width": "40px",
-        "height": "40px",
+        "width": f"{width}px",
+        "height": f"{width}px",
         "textAlign": "center",
         "border": "1px solid black",
-        "fontSize": "24px",
-        "borderTop": ("3px solid black" if y % 3 == 0 else ""),
-        "borderLeft": ("3px solid black" if x % 3 == 0 else ""),
+        "fontSize": f"{font_size}px",
+        "borderTop": ("3px solid black" if y % box == 0 else ""),
+        "borderLeft": ("3px solid black" if x % box == 0 else ""),
     }
     if data is None:
         return html.Td("", style=style)
@@ -48,7 +63,7 @@ def sudoku_cell(
                 ""
                 if cell is None
                 else (
-                    candidates_cell(y, x, cell, None, True)
+                    candidates_cell(y, x, cell, None, True, size)
                     if isinstance(cell, list)
                     else cell
                 )
@@ -61,12 +76,16 @@ def sudoku_cell(
         style = style | {
             "backgroundColor": "lightgreen" if y == new_y and x == new_x else None
         }
+    elif view_board_details and step["type"] == "wave":
+        style = style | {
+            "backgroundColor": "lightgreen" if [y, x] in step["positions"] else None
+        }
     return html.Td(
         (
             ""
             if cell is None
             else (
-                candidates_cell(y, x, cell, step, view_board_details)
+                candidates_cell(y, x, cell, step, view_board_details, size)
                 if isinstance(cell, list)
                 else cell
             )
@@ -81,15 +100,17 @@ def candidates_cell(
     digits: list[int],
     step: type_defs.Step | None,
     view_board_details: bool,
+    size: int = 9,
 ):
+    box = isqrt(size)
     divStyle = {
         "display": "grid",
-        "gridTemplateRows": "repeat(3, 1fr)",
-        "gridTemplateColumns": "repeat(3, 1fr)",
+        "gridTemplateRows": f"repeat({box}, 1fr)",
+        "gridTemplateColumns": f"repeat({box}, 1fr)",
         "width": "100%",
         "height": "100%",
         "overflow": "hidden",
-        "fontSize": "10px",
+        "fontSize": f"{CELL_METRICS[size][2]}px",
     }
     spanStyle = {
         "display": "flex",
@@ -102,7 +123,7 @@ def candidates_cell(
         return html.Div(
             [
                 html.Span(digit if digit in digits else "", style=spanStyle)
-                for digit in range(1, 10)
+                for digit in range(1, size + 1)
             ],
             style=divStyle,
         )
@@ -127,7 +148,29 @@ def candidates_cell(
                         ),
                     },
                 )
-                for digit in range(1, 10)
+                for digit in range(1, size + 1)
+            ],
+            style=divStyle,
+        )
+    if step["type"] == "wave":
+        sees = methods.geometry(size).sees
+        wave_digits = {
+            digit
+            for (curr_y, curr_x), digit in zip(step["positions"], step["digits"])
+            if sees((curr_y, curr_x), (y, x))
+        }
+        return html.Div(
+            [
+                html.Span(
+                    digit if digit in digits else "",
+                    style=spanStyle
+                    | (
+                        {"backgroundColor": "red", "color": "white"}
+                        if digit in digits and digit in wave_digits
+                        else {}
+                    ),
+                )
+                for digit in range(1, size + 1)
             ],
             style=divStyle,
         )
@@ -135,7 +178,7 @@ def candidates_cell(
     relevant_positions = step["positions"]
     removed_positions = step["candidates_removed_positions"]
     spans = []
-    for digit in range(1, 10):
+    for digit in range(1, size + 1):
         style = {}
         if digit in digits and digit in removed_digits:
             if [y, x] in removed_positions:
@@ -0,0 +1,12 @@
+import os
+
+bind = os.environ.get("SUDOKU_BIND", "0.0.0.0:8050")
+workers = int(os.environ.get("SUDOKU_WORKERS", "0")) or (os.cpu_count() or 1) + 1
+threads = int(os.environ.get("SUDOKU_THREADS", "4"))
+# Every worker starts its own /api solver pool; split the CPUs between them
+# rather than giving each worker a pool as large as the host.
+os.environ.setdefault(
+    "SUDOKU_API_WORKERS", str(max(1, (os.cpu_count() or 1) // workers))
+)
+wsgi_app = "wsgi:application"
+preload_app = os.environ.get("SUDOKU_PRELOAD", "1") != "0"
@@ -0,0 +1,451 @@
+import argparse
+from collections.abc import Iterator
+from contextlib import contextmanager
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+from benchmarks import float_list, int_list, percentile
+import methods
+
+Address = tuple[str, int]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port: int, env: dict[str, str], server: str) -> subprocess.Popen:
+    """Starts the app on `port` with the werkzeug development server, or
+    with gunicorn and gunicorn.conf.py as deployed."""
+    if server == "gunicorn":
+        command = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py"]
+        env = {"SUDOKU_BIND": f"127.0.0.1:{port}"} | env
+    else:
+        command = [sys.executable, __file__, "serve", "--port", str(port)]
+    process = subprocess.Popen(
+        command,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=os.environ | env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return process
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("server did not start")
+
+
+@contextmanager
+def target(args: argparse.Namespace, env: dict[str, str]) -> Iterator[Address]:
+    """The address to load: `--url` as given, otherwise a server started on
+    a free local port for the duration of the block."""
+    if args.url is not None:
+        url = urlsplit(args.url)
+        yield url.hostname, url.port or 80
+        return
+    port = free_port()
+    server = start_server(port, env, args.server)
+    try:
+        yield "127.0.0.1", port
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def serve(args: argparse.Namespace):
+    from werkzeug.serving import run_simple
+    import main
+
+    run_simple("127.0.0.1", args.port, main.server, threaded=True)
+
+
+def sample_boards(puzzles: int) -> list[dict]:
+    payloads = []
+    for _ in range(puzzles):
+        sudoku = methods.SudokuManager()
+        givens = [row.copy() for row in sudoku.puzzle]
+        sudoku.logic_solve()
+        steps = sudoku.steps.to_list()
+        reversible = methods.ReversibleBoard(sudoku.puzzle)
+        for applied in range(0, len(steps), 4):
+            reversible.seek(steps, applied)
+            board = [
+                [cell if isinstance(cell, int) else None for cell in row]
+                for row in reversible.board
+            ]
+            payloads.append({"board": board})
+        payloads.append({"board": givens})
+    return payloads
+
+
+def run_load(
+    address: Address,
+    endpoint: str,
+    payloads: list[dict],
+    concurrency: int,
+    requests: int,
+) -> dict:
+    latencies: list[float] = []
+    batch_sizes: list[int] = []
+    errors = 0
+    lock = threading.Lock()
+    counter = iter(range(requests))
+
+    def worker():
+        nonlocal errors
+        connection = http.client.HTTPConnection(*address)
+        for index in counter:
+            body = json.dumps(payloads[index % len(payloads)])
+            start = time.perf_counter()
+            try:
+                connection.request(
+                    "POST",
+                    f"/api/{endpoint}",
+                    body,
+                    {"Content-Type": "application/json"},
+                )
+                response = connection.getresponse()
+                response.read()
+                elapsed = time.perf_counter() - start
+                with lock:
+                    latencies.append(elapsed)
+                    batch_sizes.append(int(response.getheader("X-Batch-Size", "1")))
+                    errors += response.status >= 500
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                connection = http.client.HTTPConnection(*address)
+                with lock:
+                    errors += 1
+        connection.close()
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return {
+        "throughput": len(latencies) / elapsed,
+        "p50": percentile(latencies, 0.5),
+        "p99": percentile(latencies, 0.99),
+        "batch": sum(batch_sizes) / max(1, len(batch_sizes)),
+        "errors": errors,
+    }
+
+
+def api_load(args: argparse.Namespace):
+    payloads = sample_boards(args.puzzles)
+    print(f"endpoint /api/{args.endpoint}, {args.requests} requests per run")
+    print(
+        f"{'window':>8}{'conc':>6}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}"
+        f"{'batch':>8}{'errors':>8}"
+    )
+    # A server given by --url keeps whatever batch window it was started with.
+    for window in args.windows if args.url is None else ["-"]:
+        with target(args, {"SUDOKU_BATCH_WINDOW_MS": str(window)}) as address:
+            run_load(address, args.endpoint, payloads, 1, 20)
+            for concurrency in args.concurrency:
+                result = run_load(
+                    address, args.endpoint, payloads, concurrency, args.requests
+                )
+                print(
+                    f"{window:>8}{concurrency:>6}{result['throughput']:>10.0f}"
+                    f"{result['p50'] * 1e3:>10.2f}{result['p99'] * 1e3:>10.2f}"
+                    f"{result['batch']:>8.1f}{result['errors']:>8}"
+                )
+
+
+DASH_ACTIONS = {
+    "new": 1,
+    "next": 8,
+    "previous": 4,
+    "jump-to-start": 1,
+    "jump-to-end": 1,
+    "expand": 2,
+    "slider": 4,
+    "toggle": 2,
+}
+BUTTON_ACTIONS = ("next", "previous", "jump-to-start", "jump-to-end", "expand")
+
+
+class DashSession:
+    """One browser tab: holds the component props and, for each action,
+    fires the callback the Dash renderer would, then every server callback
+    listening to a prop it changed, one request at a time."""
+
+    def __init__(self, address: Address, layout: dict, dependencies: list, rng):
+        self.connection = http.client.HTTPConnection(*address)
+        self.rng = rng
+        self.props: dict[str, object] = {}
+        self._collect_props(layout)
+        self.dependencies = [
+            dependency
+            for dependency in dependencies
+            if dependency.get("clientside_function") is None
+        ]
+        self.latencies: dict[str, list[float]] = {}
+        self.errors: dict[str, int] = {}
+
+    def _collect_props(self, node):
+        if isinstance(node, list):
+            for child in node:
+                self._collect_props(child)
+        if not isinstance(node, dict) or "props" not in node:
+            return
+        props = node["props"]
+        if "id" in props:
+            for name, value in props.items():
+                if name != "children":
+                    self.props[f"{props['id']}.{name}"] = value
+        self._collect_props(props.get("children"))
+
+    def act(self) -> str:
+        data = self.props.get("sudoku-data.data")
+        actions = {"new": DASH_ACTIONS["new"]}
+        if data is not None and len(data["steps"]) > 0:
+            actions["slider"] = DASH_ACTIONS["slider"]
+            actions["toggle"] = DASH_ACTIONS["toggle"]
+            for button in BUTTON_ACTIONS:
+                if not self.props.get(f"{button}-btn.disabled"):
+                    actions[button] = DASH_ACTIONS[button]
+        action = self.rng.choices(list(actions), list(actions.values()))[0]
+        match action:
+            case "slider":
+                prop = "step-index-slider.value"
+                self.props[prop] = self.rng.randint(0, len(data["steps"]))
+            case "toggle":
+                prop = "view-board-details-toggle.value"
+                self.props[prop] = [] if self.props.get(prop) else ["details"]
+            case _:
+                prop = f"{action}-btn.n_clicks"
+                self.props[prop] = (self.props.get(prop) or 0) + 1
+        self.changed([prop])
+        data = self.props.get("sudoku-data.data")
+        if data is not None and data.get("stream"):
+            self.follow_stream(data)
+        return action
+
+    def changed(self, props: list[str], source: dict | None = None):
+        # The renderer does not re-fire a callback for its own outputs.
+        for dependency in self.dependencies:
+            if dependency is source:
+                continue
+            inputs = [
+                f"{item['id']}.{item['property']}" for item in dependency["inputs"]
+            ]
+            triggered = [prop for prop in props if prop in inputs]
+            if triggered:
+                self.changed(self.fire(dependency, triggered), dependency)
+
+    def fire(self, dependency: dict, triggered: list[str]) -> list[str]:
+        outputs = [
+            dict(zip(("id", "property"), output.rsplit(".", 1)))
+            for output in dependency["output"].strip(".").split("...")
+        ]
+        body = {
+            "output": dependency["output"],
+            "outputs": outputs if len(outputs) > 1 else outputs[0],
+            "inputs": [self._value(item) for item in dependency["inputs"]],
+            "state": [self._value(item) for item in dependency["state"]],
+            "changedPropIds": triggered,
+        }
+        label = f"{outputs[0]['id']}.{outputs[0]['property']}"
+        if len(outputs) > 1:
+            label += f" (+{len(outputs) - 1})"
+        status, response = self.request(
+            label, "POST", "/_dash-update-component", json.dumps(body)
+        )
+        if status != 200:
+            return []
+        updated = []
+        for component, values in json.loads(response)["response"].items():
+            for name, value in values.items():
+                self.props[f"{component}.{name}"] = value
+                updated.append(f"{component}.{name}")
+        return updated
+
+    def follow_stream(self, data: dict):
+        """Reads the solve stream to the end and appends its steps to the
+        store, as assets/stream.js does batch by batch."""
+        status, body = self.request(
+            "stream/solve",
+            "GET",
+            f"/stream/solve?puzzle={data['stream']}&start={len(data['steps'])}",
+        )
+        if status != 200:
+            return
+        steps = list(data["steps"])
+        for event in body.split("\n\n"):
+            if event.startswith("event: steps"):
+                steps.extend(json.loads(event.split("data: ", 1)[1]))
+        self.props["sudoku-data.data"] = data | {"steps": steps, "stream": None}
+        self.props["step-index-slider.max"] = len(steps)
+        self.changed(["sudoku-data.data"])
+
+    def request(
+        self, label: str, method: str, path: str, body: str | None = None
+    ) -> tuple[int, str]:
+        start = time.perf_counter()
+        try:
+            self.connection.request(
+                method, path, body, {"Content-Type": "application/json"}
+            )
+            response = self.connection.getresponse()
+            status, text = response.status, response.read().decode()
+        except (OSError, http.client.HTTPException):
+            self.connection.close()
+            status, text = 0, ""
+        self.latencies.setdefault(label, []).append(time.perf_counter() - start)
+        self.errors[label] = self.errors.get(label, 0) + (status not in (200, 204))
+        return status, text
+
+    def _value(self, item: dict) -> dict:
+        value = self.props.get(f"{item['id']}.{item['property']}")
+        return {"id": item["id"], "property": item["property"], "value": value}
+
+
+def run_sessions(
+    address: Address, concurrency: int, actions: int, seed: int
+) -> tuple[float, list[DashSession], list[float]]:
+    layout = json.loads(fetch(address, "/_dash-layout"))
+    dependencies = json.loads(fetch(address, "/_dash-dependencies"))
+    sessions = [
+        DashSession(address, layout, dependencies, random.Random(seed + index))
+        for index in range(concurrency)
+    ]
+    action_latencies: list[float] = []
+    lock = threading.Lock()
+    counter = iter(range(actions))
+
+    def worker(session: DashSession):
+        for _ in counter:
+            start = time.perf_counter()
+            session.act()
+            with lock:
+                action_latencies.append(time.perf_counter() - start)
+        session.connection.close()
+
+    threads = [threading.Thread(target=worker, args=(session,)) for session in sessions]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start, sessions, action_latencies
+
+
+def fetch(address: Address, path: str) -> str:
+    connection = http.client.HTTPConnection(*address)
+    try:
+        connection.request("GET", path)
+        return connection.getresponse().read().decode()
+    finally:
+        connection.close()
+
+
+def dash_load(args: argparse.Namespace):
+    env = dict(item.split("=", 1) for item in args.env)
+    print(f"{args.actions} actions per run, action mix {DASH_ACTIONS}")
+    with target(args, env) as address:
+        run_sessions(address, 1, 20, args.seed)
+        for concurrency in args.concurrency:
+            elapsed, sessions, action_latencies = run_sessions(
+                address, concurrency, args.actions, args.seed
+            )
+            latencies: dict[str, list[float]] = {}
+            errors: dict[str, int] = {}
+            for session in sessions:
+                for label, samples in session.latencies.items():
+                    latencies.setdefault(label, []).extend(samples)
+                    errors[label] = errors.get(label, 0) + session.errors[label]
+            calls = sum(len(samples) for samples in latencies.values())
+            print(
+                f"\nconcurrency {concurrency}:"
+                f" {len(action_latencies) / elapsed:.1f} actions/s"
+                f" (p50 {percentile(action_latencies, 0.5) * 1e3:.1f}ms"
+                f" p99 {percentile(action_latencies, 0.99) * 1e3:.1f}ms),"
+                f" {calls / elapsed:.1f} requests/s,"
+                f" {sum(errors.values()) / max(1, calls):.2%} errors"
+            )
+            print(
+                f"  {'callback':36}{'calls':>7}{'p50 ms':>9}{'p95 ms':>9}"
+                f"{'p99 ms':>9}{'errors':>8}"
+            )
+            for label, samples in sorted(latencies.items()):
+                print(
+                    f"  {label:36}{len(samples):>7}"
+                    f"{percentile(samples, 0.5) * 1e3:>9.2f}"
+                    f"{percentile(samples, 0.95) * 1e3:>9.2f}"
+                    f"{percentile(samples, 0.99) * 1e3:>9.2f}"
+                    f"{errors[label]:>8}"
+                )
+
+
+def add_target_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument(
+        "--server",
+        choices=["werkzeug", "gunicorn"],
+        default="werkzeug",
+        help="server to start: the development server or gunicorn.conf.py",
+    )
+    parser.add_argument(
+        "--url", help="load an already running app at this base URL instead"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sudoku Assistant load generator")
+    subparsers = parser.add_subparsers(required=True)
+
+    serve_parser = subparsers.add_parser("serve", help="serve the app locally")
+    serve_parser.add_argument("--port", type=int, default=8050)
+    serve_parser.set_defaults(run=serve)
+
+    api_parser = subparsers.add_parser("api", help="load the JSON API endpoints")
+    api_parser.add_argument(
+        "--endpoint", choices=["solve", "hint", "grade", "validate"], default="hint"
+    )
+    api_parser.add_argument("--windows", type=float_list, default=[0, 2])
+    api_parser.add_argument("--concurrency", type=int_list, default=[1, 8, 32])
+    api_parser.add_argument("--requests", type=int, default=2000)
+    api_parser.add_argument("--puzzles", type=int, default=5)
+    add_target_arguments(api_parser)
+    api_parser.set_defaults(run=api_load)
+
+    dash_parser = subparsers.add_parser(
+        "dash", help="simulate browser sessions through the Dash callbacks"
+    )
+    dash_parser.add_argument("--concurrency", type=int_list, default=[1, 4, 16])
+    dash_parser.add_argument("--actions", type=int, default=500)
+    dash_parser.add_argument("--seed", type=int, default=0)
+    dash_parser.add_argument(
+        "--env",
+        action="append",
+        default=[],
+        metavar="NAME=VALUE",
+        help="environment variable for the server, e.g. SUDOKU_RENDER_PREFETCH=0",
+    )
+    add_target_arguments(dash_parser)
+    dash_parser.set_defaults(run=dash_load)
+
+    args = parser.parse_args()
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,39 @@
-from dash import Dash, Input, Output, State, ctx, dcc, html, no_update
-import dash_bootstrap_components as dbc
+from collections import OrderedDict
+from dash import (
+    ClientsideFunction,
+    Dash,
+    Input,
+    Output,
+    State,
+    ctx,
+    dcc,
+    html,
+    no_update,
+)
+from flask import Response, request
+from plotly.io.json import to_json_plotly
+import api
+import cache
 import components
 import methods
+import tracing
 import type_defs
+import hashlib
+import json
+import os
+import queue
+import threading
+
+TRACE_BOARDS_MAX_SIZE = 64
+RENDER_PREFETCH = os.environ.get("SUDOKU_RENDER_PREFETCH", "1") != "0"
+
+trace_boards: OrderedDict[str, methods.ReversibleBoard] = OrderedDict()
+trace_boards_lock = threading.Lock()
+render_cache = cache.RenderCache(cache.RENDER_CACHE_BYTES)
+prefetch_queue: queue.Queue = queue.Queue(maxsize=8)
+prefetcher: threading.Thread | None = None
 
+EMPTY_SUDOKU_TABLE = components.sudoku_table(None, True)
 
 app = Dash(
     __name__,
@@ -12,6 +42,42 @@ app = Dash(
 )
 
 server = app.server
+server.register_blueprint(api.blueprint)
+
+
+def request_size() -> int | None:
+    return request.content_length
+
+
+@server.get("/metrics")
+def metrics():
+    return tracing.render_metrics(), {"Content-Type": "text/plain; version=0.0.4"}
+
+
+@server.get("/stream/solve")
+def stream_solve():
+    """Server-sent events with the steps of `puzzle` (a givens key) from
+    `start` on, in batches as they are found, then a `done` event."""
+    try:
+        puzzle = cache.parse_board_key(request.args.get("puzzle", ""))
+        methods.validate_board(puzzle)
+        start = int(request.args.get("start", "0"))
+        if start < 0:
+            raise ValueError("start must not be negative")
+    except ValueError as error:
+        return str(error), 400
+
+    def events():
+        for steps in cache.stream_trace(puzzle, waves=True, start=start):
+            yield f"event: steps\ndata: {json.dumps(steps)}\n\n"
+        yield "event: done\ndata: {}\n\n"
+
+    return Response(
+        events(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 
 app.layout = html.Div(
     html.Div(
@@ -42,7 +108,7 @@ app.layout = html.Div(
                 ],
                 style={"display": "flex", "justifyContent": "center", "gap": "1rem"},
             ),
-            html.Div(id="sudoku-div"),
+            html.Div(EMPTY_SUDOKU_TABLE, id="sudoku-div"),
             html.Button("New", id="new-btn"),
             html.Div(
                 [
@@ -50,11 +116,12 @@ app.layout = html.Div(
                     html.Button("◀", id="previous-btn"),
                     html.Button("▶", id="next-btn"),
                     html.Button("⏭", id="jump-to-end-btn"),
-                    dbc.Checkbox(
+                    html.Button("Expand", id="expand-btn", disabled=True),
+                    dcc.Checklist(
                         id="view-board-details-toggle",
-                        value=True,
+                        options=[{"label": "View board details", "value": "details"}],
+                        value=["details"],
                         persistence_type="local",
-                        label="View board details",
                     ),
                     dcc.Slider(
                         id="step-index-slider",
@@ -80,10 +147,14 @@ app.layout = html.Div(
     Input("sudoku-data", "data"),
     prevent_initial_call=True,
 )
+@tracing.traced("callback", size=request_size)
 def render_sudoku_step(data: type_defs.SudokuData | None):
     if data is None:
         return no_update
 
+    if len(data["steps"]) == 0 and data["stream"] is not None:
+        return [html.H3("Solving…")]
+
     if len(data["steps"]) == 0:
         return [
             html.H3("No logical next steps found."),
@@ -100,7 +171,16 @@ def render_sudoku_step(data: type_defs.SudokuData | None):
         ]
 
     step = data["steps"][data["step_index"]]
-    if step["type"] == "fill":
+    if step["type"] == "wave":
+        placements = ", ".join(
+            f"{digit} at row {y+1} column {x+1}"
+            for (y, x), digit in zip(step["positions"], step["digits"])
+        )
+        explanation = html.P(
+            f"Place {len(step["digits"])} digits in one sweep: {placements}. "
+            "Expand to go through them one at a time."
+        )
+    elif step["type"] == "fill":
         y, x = step["position"]
         digit = step["digit"]
         explanation = html.P(
@@ -123,12 +203,76 @@ def render_sudoku_step(data: type_defs.SudokuData | None):
     Output("sudoku-div", "children"),
     Input("sudoku-data", "data"),
     Input("view-board-details-toggle", "value"),
+    prevent_initial_call=True,
 )
-def render_sudoku_board(data: type_defs.SudokuData | None, view_board_details: bool):
-    return components.sudoku_table(
-        apply_steps(data, view_board_details) if data is not None else None,
-        view_board_details,
-    )
+@tracing.traced("callback", size=request_size)
+def render_sudoku_board(data: type_defs.SudokuData | None, toggle_value: list[str]):
+    if data is None:
+        return EMPTY_SUDOKU_TABLE
+    return cached_view(data, "details" in toggle_value)
+
+
+def cached_view(data: type_defs.SudokuData, view_board_details: bool) -> dict:
+    key = (trace_key(data), data["step_index"], view_board_details)
+    view = render_cache.get(key)
+    if view is None:
+        view, nbytes = render_view(data, key)
+        render_cache.put(key, view, nbytes)
+    if RENDER_PREFETCH:
+        prefetch_neighbours(data, key)
+    return view
+
+
+def render_view(
+    data: type_defs.SudokuData, key: tuple, kind: str = "phase"
+) -> tuple[dict, int]:
+    """Renders the board at the current step as the JSON-ready dict Dash
+    would send, so cached views skip serializing the component tree too.
+    `key` is its render cache key; the phases are timed as spans of `kind`."""
+    trace, _, view_board_details = key
+    with tracing.span(kind, "apply_steps", len(data["steps"])):
+        data = apply_steps(data, view_board_details, trace)
+    with tracing.span(kind, "sudoku_table"):
+        table = components.sudoku_table(data, view_board_details)
+    with tracing.span(kind, "serialize_view"):
+        serialized = to_json_plotly(table)
+    return json.loads(serialized), len(serialized)
+
+
+def prefetch_neighbours(data: type_defs.SudokuData, key: tuple):
+    global prefetcher
+    with trace_boards_lock:
+        if prefetcher is None:
+            prefetcher = threading.Thread(target=_prefetch_views, daemon=True)
+            prefetcher.start()
+    trace, index, view_board_details = key
+    for neighbour in (index + 1, index - 1):
+        if not -1 <= neighbour < len(data["steps"]):
+            continue
+        if (trace, neighbour, view_board_details) in render_cache:
+            continue
+        try:
+            prefetch_queue.put_nowait(
+                (
+                    (trace, neighbour, view_board_details),
+                    {**data, "step_index": neighbour},
+                )
+            )
+        except queue.Full:
+            return
+
+
+def _prefetch_views():
+    while True:
+        key, data = prefetch_queue.get()
+        if key in render_cache:
+            continue
+        try:
+            with tracing.span("prefetch", "render_view"):
+                render_cache.put(key, *render_view(data, key, "prefetch"))
+        except Exception:
+            tracing.count("sudoku_prefetch_errors_total")
+            server.logger.exception("prefetching view %r failed", key[1:])
 
 
 @app.callback(
@@ -136,6 +280,7 @@ def render_sudoku_board(data: type_defs.SudokuData | None, view_board_details: b
     State("sudoku-solution-controls", "style"),
     Input("sudoku-data", "data"),
 )
+@tracing.traced("callback", size=request_size)
 def toggle_solution_controls_display(style, data: type_defs.SudokuData | None):
     if data is None or len(data["steps"]) == 0:
         return {"display": "none"}
@@ -151,17 +296,22 @@ def toggle_solution_controls_display(style, data: type_defs.SudokuData | None):
     Output("previous-btn", "disabled"),
     Output("next-btn", "disabled"),
     Output("jump-to-end-btn", "disabled"),
+    Output("expand-btn", "disabled"),
     Input("sudoku-data", "data"),
 )
+@tracing.traced("callback", size=request_size)
 def toggle_solution_controls_disabled(data: type_defs.SudokuData | None):
     if data is None:
-        return [True, True, True, True]
+        return [True, True, True, True, True]
     index = data["step_index"]
     if index <= -1:
-        return [True, True, False, False]
+        return [True, True, False, False, True]
+    expand_disabled = (
+        data["steps"][index]["type"] != "wave" or data["stream"] is not None
+    )
     if index >= len(data["steps"]) - 1:
-        return [False, False, True, True]
-    return [False, False, False, False]
+        return [False, False, True, True, expand_disabled]
+    return [False, False, False, False, expand_disabled]
 
 
 @app.callback(
@@ -175,9 +325,11 @@ def toggle_solution_controls_disabled(data: type_defs.SudokuData | None):
     Input("previous-btn", "n_clicks"),
     Input("next-btn", "n_clicks"),
     Input("jump-to-end-btn", "n_clicks"),
+    Input("expand-btn", "n_clicks"),
     Input("step-index-slider", "value"),
     prevent_initial_call=True,
 )
+@tracing.traced("callback", size=request_size)
 def update_sudoku_data(
     data: type_defs.SudokuData,
     new_btn_n_clicks,
@@ -185,20 +337,38 @@ def update_sudoku_data(
     previous_btn_n_clicks,
     next_btn_n_clicks,
     jump_to_end_btn_n_clicks,
+    expand_btn_n_clicks,
     step_index_slider_value,
 ):
     if ctx.triggered_id == "new-btn":
-        sudoku = methods.SudokuManager()
-        sudoku.logic_solve()
+        with tracing.span("phase", "new_puzzle"):
+            puzzle, trace = cache.new_puzzle()
+        if trace is None:
+            # Solved while the user watches: assets/stream.js follows
+            # /stream/solve and appends the steps as they arrive.
+            candidates = methods.candidates_board(puzzle)
+            return (
+                {
+                    "puzzle": candidates,
+                    "board": candidates,
+                    "steps": [],
+                    "step_index": -1,
+                    "stream": cache.board_key(puzzle),
+                },
+                0,
+                0,
+                0,
+            )
         return (
             {
-                "puzzle": sudoku.puzzle,
-                "board": sudoku.puzzle,
-                "steps": sudoku.steps,
+                "puzzle": trace["puzzle"],
+                "board": trace["puzzle"],
+                "steps": trace["steps"],
                 "step_index": -1,
+                "stream": None,
             },
             0,
-            len(sudoku.steps),
+            len(trace["steps"]),
             0,
         )
 
@@ -221,6 +391,20 @@ def update_sudoku_data(
             if index == len(steps) - 1:
                 return no_update, no_update, no_update, no_update
             data["step_index"] = len(steps) - 1
+        case "expand-btn":
+            if (
+                index == -1
+                or steps[index]["type"] != "wave"
+                or data["stream"] is not None
+            ):
+                return no_update, no_update, no_update, no_update
+            board = seek_board(trace_key(data), data, index)
+            data["steps"] = (
+                steps[:index]
+                + methods.expand_wave(board, steps[index])
+                + steps[index + 1 :]
+            )
+            return data, no_update, len(data["steps"]), index + 1
         case "step-index-slider":
             if index == step_index_slider_value - 1:
                 return no_update, no_update, no_update, no_update
@@ -230,36 +414,51 @@ def update_sudoku_data(
     return data, no_update, no_update, data["step_index"] + 1
 
 
+app.clientside_callback(
+    ClientsideFunction(namespace="stream", function_name="follow"),
+    Input("sudoku-data", "data"),
+)
+
+
+def trace_key(data: type_defs.SudokuData) -> str:
+    """Digest of the puzzle and step list, computed here rather than taken
+    from the client, so sessions share boards and views only when their
+    traces are identical."""
+    content = json.dumps([data["puzzle"], data["steps"]]).encode()
+    return hashlib.blake2b(content, digest_size=16).hexdigest()
+
+
+def seek_board(
+    trace: str, data: type_defs.SudokuData, applied: int, partial: bool = False
+) -> type_defs.CandidatesBoard:
+    """The board after the first `applied` steps of `data`, from the shared
+    `ReversibleBoard` of `trace` (the trace's `trace_key`)."""
+    with trace_boards_lock:
+        board = trace_boards.pop(trace, None)
+        if board is None:
+            board = methods.ReversibleBoard(data["puzzle"])
+        # A seek that raises leaves the board half-applied, so the board is
+        # only put back once it succeeds.
+        board.seek(data["steps"], applied, partial)
+        trace_boards[trace] = board
+        while len(trace_boards) > TRACE_BOARDS_MAX_SIZE:
+            trace_boards.popitem(last=False)
+        return board.snapshot()
+
+
 def apply_steps(
-    data: type_defs.SudokuData, view_board_details: bool
+    data: type_defs.SudokuData, view_board_details: bool, trace: str | None = None
 ) -> type_defs.SudokuData:
     steps = data["steps"]
     index = data["step_index"]
-    if index < -1 or index > len(steps):
+    if index < -1 or index >= len(steps):
         data["step_index"] = -1
         return data
-    board = methods.copy_board(data["puzzle"])
-    for curr_step_index in range(index + 1):
-        step = steps[curr_step_index]
-        if step["type"] == "fill":
-            y, x = step["position"]
-            digit = step["digit"]
-            board[y][x] = digit
-            if curr_step_index == index and view_board_details:
-                continue
-            for [curr_y, curr_x] in step["candidates_removed_positions"]:
-                board[curr_y][curr_x].remove(digit)
-        else:
-            removed_digits = step["removed_digits"]
-            if curr_step_index == index and view_board_details:
-                continue
-            for digit in removed_digits:
-                for [curr_y, curr_x] in step["candidates_removed_positions"]:
-                    if digit not in board[curr_y][curr_x]:
-                        continue
-                    board[curr_y][curr_x].remove(digit)
-    data["board"] = board
-    data["step_index"] = index
+    trace = trace or trace_key(data)
+    if view_board_details and index >= 0:
+        data["board"] = seek_board(trace, data, index, partial=True)
+    else:
+        data["board"] = seek_board(trace, data, index + 1)
     return data
 
 
@@ -1,101 +1,515 @@
-from sudoku import Sudoku
+from collections.abc import Iterator
+from math import isqrt
 from random import randrange
 import sys
-from type_defs import Board, CandidatesBoard, Step
-from copy import deepcopy
+import time
+from type_defs import Board, CandidatesBoard, FillStep, Step, WaveStep
+from bisect import insort
+from step_log import StepLog
+import tracing
 
+BOX_SIZES = range(2, 6)
+GROUP_NAMES = {2: "Pair", 3: "Triple", 4: "Quad", 5: "Quint"}
 
-def empty_board() -> Board:
-    return [[None for _ in range(9)] for _ in range(9)]
+
+class Geometry:
+    """Cell and unit tables of a grid made of `box` x `box` squares, with
+    `size` = box² rows, columns, squares and digits.
+
+    Units are numbered rows first, then columns, then squares, so cell
+    `(y, x)` belongs to units `(y, size + x, 2 * size + square_of[y][x])`.
+    """
+
+    def __init__(self, box: int):
+        size = box * box
+        self.box = box
+        self.size = size
+        self.digits = range(1, size + 1)
+        self.square_of: list[list[int]] = [
+            [(y // box) * box + (x // box) for x in range(size)] for y in range(size)
+        ]
+        self.units: list[list[tuple[int, int]]] = (
+            [[(y, x) for x in range(size)] for y in range(size)]
+            + [[(y, x) for y in range(size)] for x in range(size)]
+            + [
+                [(square_y + y, square_x + x) for y in range(box) for x in range(box)]
+                for square_y in range(0, size, box)
+                for square_x in range(0, size, box)
+            ]
+        )
+        self.cell_units: list[list[tuple[int, int, int]]] = [
+            [(y, size + x, 2 * size + self.square_of[y][x]) for x in range(size)]
+            for y in range(size)
+        ]
+        self.peers: list[list[list[tuple[int, int]]]] = [
+            [
+                sorted(
+                    set().union(*(self.units[unit] for unit in self.cell_units[y][x]))
+                    - {(y, x)}
+                )
+                for x in range(size)
+            ]
+            for y in range(size)
+        ]
+
+    def sees(self, a: tuple[int, int], b: tuple[int, int]) -> bool:
+        return a != b and (
+            a[0] == b[0]
+            or a[1] == b[1]
+            or self.square_of[a[0]][a[1]] == self.square_of[b[0]][b[1]]
+        )
+
+
+geometries: dict[int, Geometry] = {}
+
+
+def geometry(size: int) -> Geometry:
+    """Returns the shared tables for grids with `size` rows, built on first
+    use so that only the sizes actually served pay for them."""
+    grid = geometries.get(size)
+    if grid is None:
+        box = isqrt(size)
+        if box * box != size or box not in BOX_SIZES:
+            raise ValueError(f"unsupported grid size {size}")
+        grid = geometries[size] = Geometry(box)
+    return grid
+
+
+def empty_board(size: int = 9) -> Board:
+    return [[None for _ in range(size)] for _ in range(size)]
 
 
 def copy_board(board: CandidatesBoard) -> CandidatesBoard:
-    return deepcopy(board)
+    return [
+        [cell.copy() if isinstance(cell, list) else cell for cell in row]
+        for row in board
+    ]
+
+
+class ReversibleBoard:
+    """Candidates board that records every change on a trail so steps can be
+    applied and reverted in place, at a cost proportional to the step size."""
+
+    def __init__(self, board: CandidatesBoard):
+        self.board: CandidatesBoard = copy_board(board)
+        self._trail: list[tuple[int, int, list[int] | int]] = []
+        self._step_marks: list[int] = []
+        self._applied = 0
+        self._partial = False
+
+    @property
+    def applied(self) -> int:
+        return self._applied
+
+    def fill(self, y: int, x: int, digit: int):
+        self._trail.append((y, x, self.board[y][x]))
+        self.board[y][x] = digit
+
+    def remove_candidate(self, y: int, x: int, digit: int) -> bool:
+        cell = self.board[y][x]
+        if not isinstance(cell, list) or digit not in cell:
+            return False
+        cell.remove(digit)
+        self._trail.append((y, x, digit))
+        return True
+
+    def checkpoint(self) -> int:
+        return len(self._trail)
+
+    def rollback(self, mark: int):
+        while len(self._trail) > mark:
+            y, x, previous = self._trail.pop()
+            if isinstance(previous, list):
+                self.board[y][x] = previous
+            else:
+                insort(self.board[y][x], previous)
+
+    def apply_step(self, step: Step, eliminate: bool = True):
+        self._step_marks.append(self.checkpoint())
+        if step["type"] == "fill":
+            y, x = step["position"]
+            digit = step["digit"]
+            self.fill(y, x, digit)
+            if not eliminate:
+                return
+            for curr_y, curr_x in step["candidates_removed_positions"]:
+                self.remove_candidate(curr_y, curr_x, digit)
+            return
+        if step["type"] == "wave":
+            # Waves do not list the cells they clear, so eliminate over all
+            # peers; the loop is inlined as it runs ~20 times per cell.
+            board = self.board
+            trail = self._trail
+            peers = geometry(len(board)).peers
+            for (y, x), digit in zip(step["positions"], step["digits"]):
+                trail.append((y, x, board[y][x]))
+                board[y][x] = digit
+                if not eliminate:
+                    continue
+                for curr_y, curr_x in peers[y][x]:
+                    cell = board[curr_y][curr_x]
+                    if type(cell) is list and digit in cell:
+                        cell.remove(digit)
+                        trail.append((curr_y, curr_x, digit))
+            return
+        if not eliminate:
+            return
+        for digit in step["removed_digits"]:
+            for curr_y, curr_x in step["candidates_removed_positions"]:
+                self.remove_candidate(curr_y, curr_x, digit)
+
+    def revert_step(self):
+        self.rollback(self._step_marks.pop())
+
+    def seek(self, steps: list[Step], applied: int, partial: bool = False):
+        if self._partial:
+            self.revert_step()
+            self._partial = False
+        while self._applied > applied:
+            self.revert_step()
+            self._applied -= 1
+        while self._applied < applied:
+            self.apply_step(steps[self._applied])
+            self._applied += 1
+        if partial and applied < len(steps):
+            self.apply_step(steps[applied], eliminate=False)
+            self._partial = True
+
+    def snapshot(self) -> CandidatesBoard:
+        return copy_board(self.board)
+
+
+class StrongLinkIndex:
+    """Strong links and bivalue cells of a candidates board, updated on every
+    fill and elimination instead of being rediscovered by rescanning.
+
+    `unit_cells[unit][digit]` holds the cells of a unit (numbered as in
+    `Geometry`) that still have `digit` as a candidate, and `links[digit]`
+    maps each unit with exactly two such cells to that pair.
+    """
+
+    def __init__(self, board: CandidatesBoard):
+        self.board = board
+        self.geometry = geometry(len(board))
+        digits = self.geometry.digits
+        self.unit_cells: list[dict[int, set[tuple[int, int]]]] = [
+            {digit: set() for digit in digits} for _ in self.geometry.units
+        ]
+        self.links: dict[int, dict[int, tuple[tuple[int, int], tuple[int, int]]]] = {
+            digit: {} for digit in digits
+        }
+        self.bivalue: set[tuple[int, int]] = set()
+        for y, row in enumerate(board):
+            for x, cell in enumerate(row):
+                if not isinstance(cell, list):
+                    continue
+                for digit in cell:
+                    for unit in self.geometry.cell_units[y][x]:
+                        self.unit_cells[unit][digit].add((y, x))
+                if len(cell) == 2:
+                    self.bivalue.add((y, x))
+        for unit in range(len(self.geometry.units)):
+            for digit in digits:
+                self._update_link(unit, digit)
+
+    def cells_with(self, digit: int) -> set[tuple[int, int]]:
+        cells = set()
+        for unit in range(self.geometry.size):
+            cells |= self.unit_cells[unit][digit]
+        return cells
+
+    def fill(self, y: int, x: int, candidates: list[int]):
+        for digit in candidates:
+            self._discard(y, x, digit)
+        self.bivalue.discard((y, x))
+
+    def remove(self, y: int, x: int, digit: int):
+        self._discard(y, x, digit)
+        if len(self.board[y][x]) == 2:
+            self.bivalue.add((y, x))
+        else:
+            self.bivalue.discard((y, x))
+
+    def _discard(self, y: int, x: int, digit: int):
+        for unit in self.geometry.cell_units[y][x]:
+            self.unit_cells[unit][digit].discard((y, x))
+            self._update_link(unit, digit)
+
+    def _update_link(self, unit: int, digit: int):
+        cells = self.unit_cells[unit][digit]
+        if len(cells) == 2:
+            self.links[digit][unit] = tuple(sorted(cells))
+        else:
+            self.links[digit].pop(unit, None)
+
+
+def validate_board(board: Board, candidates: CandidatesBoard | None = None):
+    if not _is_grid(board):
+        raise ValueError(
+            f"board must be a {', '.join(GRID_NAMES[:-1])} or {GRID_NAMES[-1]} grid"
+        )
+    size = len(board)
+    square_of = geometry(size).square_of
+    rows_seen = [set() for _ in range(size)]
+    cols_seen = [set() for _ in range(size)]
+    squares_seen = [set() for _ in range(size)]
+    for y in range(size):
+        for x in range(size):
+            digit = board[y][x]
+            if digit is None:
+                continue
+            if not _is_digit(digit, size):
+                raise ValueError(f"invalid value {digit!r} at row {y+1} column {x+1}")
+            square_index = square_of[y][x]
+            if (
+                digit in rows_seen[y]
+                or digit in cols_seen[x]
+                or digit in squares_seen[square_index]
+            ):
+                raise ValueError(f"digit {digit} repeated at row {y+1} column {x+1}")
+            rows_seen[y].add(digit)
+            cols_seen[x].add(digit)
+            squares_seen[square_index].add(digit)
+    if candidates is None:
+        return
+    if not _is_grid(candidates) or len(candidates) != size:
+        raise ValueError(f"candidates must be a {size}x{size} grid")
+    for y in range(size):
+        for x in range(size):
+            cell = candidates[y][x]
+            if board[y][x] is not None or cell is None or isinstance(cell, int):
+                continue
+            if not isinstance(cell, list) or not all(
+                _is_digit(digit, size) for digit in cell
+            ):
+                raise ValueError(f"invalid candidates at row {y+1} column {x+1}")
+
+
+GRID_NAMES = [f"{box * box}x{box * box}" for box in BOX_SIZES]
+
+
+def _is_grid(board) -> bool:
+    return (
+        isinstance(board, list)
+        and len(board) in {box * box for box in BOX_SIZES}
+        and all(isinstance(row, list) and len(row) == len(board) for row in board)
+    )
+
+
+def _is_digit(value, size: int) -> bool:
+    return type(value) is int and 1 <= value <= size
+
+
+def hint(board: Board, candidates: CandidatesBoard | None = None) -> Step | None:
+    validate_board(board, candidates)
+    return SudokuManager(board).hint(candidates)
+
+
+def candidates_board(board: Board) -> CandidatesBoard:
+    sudoku = SudokuManager(board)
+    sudoku._candidates_board()
+    return sudoku.board
+
+
+COUNT_SOLUTIONS_TIMEOUT = 0.5
+
+
+class _SearchTimedOut(Exception):
+    pass
+
+
+def count_solutions(
+    board: Board, limit: int = 2, timeout: float = COUNT_SOLUTIONS_TIMEOUT
+) -> int | None:
+    """Counts solutions up to `limit`, or returns None when the search has
+    not settled the count within `timeout` seconds."""
+    sudoku = SudokuManager(board)
+    if not sudoku._candidates_board():
+        return 0
+    try:
+        return _count_solutions(
+            ReversibleBoard(sudoku.board), limit, time.perf_counter() + timeout
+        )
+    except _SearchTimedOut:
+        return None
+
+
+def _count_solutions(reversible: ReversibleBoard, limit: int, deadline: float) -> int:
+    position = None
+    fewest = len(reversible.board) + 1
+    for y, row in enumerate(reversible.board):
+        for x, cell in enumerate(row):
+            if isinstance(cell, list) and len(cell) < fewest:
+                position = (y, x)
+                fewest = len(cell)
+    if position is None:
+        return 1
+    y, x = position
+    count = 0
+    for digit in list(reversible.board[y][x]):
+        if time.perf_counter() > deadline:
+            raise _SearchTimedOut
+        mark = reversible.checkpoint()
+        if _place_digit(reversible, y, x, digit):
+            count += _count_solutions(reversible, limit - count, deadline)
+        reversible.rollback(mark)
+        if count >= limit:
+            break
+    return count
+
+
+def _place_digit(reversible: ReversibleBoard, y: int, x: int, digit: int) -> bool:
+    reversible.fill(y, x, digit)
+    for curr_y, curr_x in geometry(len(reversible.board)).peers[y][x]:
+        if not reversible.remove_candidate(curr_y, curr_x, digit):
+            continue
+        if len(reversible.board[curr_y][curr_x]) == 0:
+            return False
+    return True
+
+
+def expand_wave(board: CandidatesBoard, step: WaveStep) -> list[FillStep]:
+    """Splits a wave back into the fill steps it stands for, given the
+    candidates board just before it."""
+    sudoku = SudokuManager(board)
+    steps = []
+    for (y, x), digit in zip(step["positions"], step["digits"]):
+        sudoku._fill_cell(y, x, digit)
+        steps.append(
+            {
+                "type": "fill",
+                "name": step["name"],
+                "position": (y, x),
+                "digit": digit,
+                "candidates_removed_positions": sudoku._update_candidates_for_new_cell(
+                    y, x
+                ),
+            }
+        )
+    return steps
 
 
 class SudokuManager:
-    def __init__(self):
-        new_puzzle = Sudoku(seed=randrange(sys.maxsize)).difficulty(0.6)
-        while new_puzzle.has_multiple_solutions():
+    """Logical solver. With `waves`, every naked single sweep that fills more
+    than one cell is recorded as a single `WaveStep`."""
+
+    def __init__(self, puzzle: Board | None = None, waves: bool = False):
+        if puzzle is None:
+            from sudoku import Sudoku
+
             new_puzzle = Sudoku(seed=randrange(sys.maxsize)).difficulty(0.6)
-        self.puzzle: Board = new_puzzle.board
+            while new_puzzle.has_multiple_solutions():
+                new_puzzle = Sudoku(seed=randrange(sys.maxsize)).difficulty(0.6)
+            puzzle = new_puzzle.board
+        self.puzzle: Board = puzzle
         self.board: Board = copy_board(self.puzzle)
-        self.steps: list[Step] = []
-
-    def logic_solve(self) -> bool:
-        if not self._candidates_board():
-            return False
-        solving_methods = [
+        self.geometry = geometry(len(puzzle))
+        self.size = self.geometry.size
+        self.box = self.geometry.box
+        self.steps: StepLog = StepLog(size=self.size)
+        self.stop_early = False
+        self.solved = False
+        self.waves = waves
+        self.links: StrongLinkIndex | None = None
+        self.solving_methods = [
             self._naked_single,
             self._hidden_single,
             self._naked_pair,
             self._naked_triple,
             self._pointing_pair_or_triple,
             self._claiming_pair_or_triple,
+            self._simple_coloring,
+            self._xy_wing,
         ]
+
+    def logic_solve(self) -> bool:
+        with tracing.span("phase", "logic_solve") as solve_span:
+            for _ in self.logic_solve_iter():
+                pass
+            solve_span.size = len(self.steps)
+        return self.solved
+
+    def logic_solve_iter(self) -> Iterator[int]:
+        """Solves like `logic_solve`, yielding the number of steps recorded
+        so far every time a technique makes progress; `solved` is set once
+        the iterator is exhausted."""
+        self.solved = False
+        with tracing.span("phase", "candidates_board"):
+            if not self._candidates_board():
+                return
         progress_made = True
         while progress_made:
             if self._find_next_empty_pos() is None:
-                return True
+                self.solved = True
+                return
             progress_made = False
-            for method in solving_methods:
-                if not method():
+            for method in self.solving_methods:
+                steps_count = len(self.steps)
+                with tracing.span("phase", method.__name__[1:]) as method_span:
+                    found = method()
+                    method_span.size = len(self.steps) - steps_count
+                if not found:
                     continue
                 progress_made = True
+                yield len(self.steps)
                 break
-        return False
+
+    def hint(self, candidates: CandidatesBoard | None = None) -> Step | None:
+        if not self._candidates_board(candidates):
+            raise ValueError("board has a cell without candidates")
+        self.stop_early = True
+        for method in self.solving_methods:
+            if method():
+                return self.steps[0]
+        return None
 
     def _find_next_empty_pos(self) -> tuple[int, int] | None:
-        for y in range(9):
-            for x in range(9):
-                if not isinstance(self.board[y][x], int):
+        for y in range(self.size):
+            for x in range(self.size):
+                if isinstance(self.board[y][x], int):
                     continue
                 return (y, x)
         return None
 
-    def _check_new_digit_valid(self, y: int, x: int, digit: int) -> bool:
-        if self.board[y].count(digit):
-            return False
-        if self._get_transpose()[x].count(digit):
-            return False
-        if self._get_square(y, x).count(digit):
-            return False
-        return True
-
-    def _get_transpose(self) -> Board:
-        new_board = empty_board()
-        for y in range(9):
-            for x in range(9):
-                new_board[y][x] = self.board[x][y]
-        return new_board
-
-    def _get_square(self, y: int, x: int) -> list[int | None]:
-        return [
-            self.board[curr_y][curr_x]
-            for (curr_y, curr_x) in self._get_square_coords(y, x)
-        ]
-
     def _get_square_coords(self, y: int, x: int) -> list[tuple[int, int]]:
-        min_y = (y // 3) * 3
-        max_y = (y // 3) * 3 + 3
-        min_x = (x // 3) * 3
-        max_x = (x // 3) * 3 + 3
+        min_y = (y // self.box) * self.box
+        max_y = min_y + self.box
+        min_x = (x // self.box) * self.box
+        max_x = min_x + self.box
         return [
             (curr_y, curr_x)
             for curr_x in range(min_x, max_x)
             for curr_y in range(min_y, max_y)
         ]
 
-    def _candidates_board(self) -> bool:
+    def _candidates_board(self, candidates: CandidatesBoard | None = None) -> bool:
         solvable = True
-        for y in range(9):
-            for x in range(9):
+        rows_used = [set() for _ in range(self.size)]
+        cols_used = [set() for _ in range(self.size)]
+        squares_used = [set() for _ in range(self.size)]
+        for y in range(self.size):
+            for x in range(self.size):
+                digit = self.board[y][x]
+                if digit is None:
+                    continue
+                rows_used[y].add(digit)
+                cols_used[x].add(digit)
+                squares_used[self.geometry.square_of[y][x]].add(digit)
+        for y in range(self.size):
+            for x in range(self.size):
                 if self.board[y][x] is not None:
                     continue
+                used = (
+                    rows_used[y]
+                    | cols_used[x]
+                    | squares_used[self.geometry.square_of[y][x]]
+                )
+                allowed = candidates[y][x] if candidates is not None else None
                 digits = [
                     digit
-                    for digit in range(1, 10)
-                    if self._check_new_digit_valid(y, x, digit)
+                    for digit in self.geometry.digits
+                    if digit not in used
+                    and (not isinstance(allowed, list) or digit in allowed)
                 ]
                 if len(digits) == 0:
                     solvable = False
@@ -103,37 +517,50 @@ class SudokuManager:
         self.puzzle = copy_board(self.board)
         return solvable
 
+    def _fill_cell(self, y: int, x: int, digit: int):
+        candidates = self.board[y][x]
+        self.board[y][x] = digit
+        if self.links is not None:
+            self.links.fill(y, x, candidates)
+
+    def _remove_candidate(self, y: int, x: int, digit: int):
+        self.board[y][x].remove(digit)
+        if self.links is not None:
+            self.links.remove(y, x, digit)
+
     def _update_candidates_for_new_cell(self, y: int, x: int) -> list[tuple[int, int]]:
         removed_candidates = []
         digit = self.board[y][x]
         for curr_x, cell in enumerate(self.board[y]):
             if not isinstance(cell, list) or digit not in cell:
                 continue
-            cell.remove(digit)
+            self._remove_candidate(y, curr_x, digit)
             removed_candidates.append((y, curr_x))
-        for curr_y, cell in enumerate(self._get_transpose()[x]):
+        for curr_y in range(self.size):
+            cell = self.board[curr_y][x]
             if not isinstance(cell, list) or digit not in cell:
                 continue
-            cell.remove(digit)
+            self._remove_candidate(curr_y, x, digit)
             removed_candidates.append((curr_y, x))
         for curr_y, curr_x in self._get_square_coords(y, x):
             cell = self.board[curr_y][curr_x]
             if not isinstance(cell, list) or digit not in cell:
                 continue
-            cell.remove(digit)
+            self._remove_candidate(curr_y, curr_x, digit)
             removed_candidates.append((curr_y, curr_x))
         return removed_candidates
 
     def _naked_single(self) -> bool:
         progress_made = False
-        for y in range(9):
-            for x in range(9):
+        wave: list[FillStep] = []
+        for y in range(self.size):
+            for x in range(self.size):
                 cell = self.board[y][x]
                 if not isinstance(cell, list) or len(cell) != 1:
                     continue
                 digit = cell[0]
-                self.board[y][x] = digit
-                step: Step = {
+                self._fill_cell(y, x, digit)
+                step: FillStep = {
                     "type": "fill",
                     "name": "Naked Single",
                     "digit": digit,
@@ -142,42 +569,44 @@ class SudokuManager:
                         y, x
                     ),
                 }
-                self.steps.append(step)
                 progress_made = True
+                if self.waves and not self.stop_early:
+                    wave.append(step)
+                    continue
+                self.steps.append(step)
+                if self.stop_early:
+                    return True
+        if len(wave) == 1:
+            self.steps.append(wave[0])
+        elif len(wave) > 1:
+            self.steps.append(
+                {
+                    "type": "wave",
+                    "name": "Naked Single",
+                    "positions": [step["position"] for step in wave],
+                    "digits": [step["digit"] for step in wave],
+                }
+            )
         return progress_made
 
     def _hidden_single(self) -> bool:
-        rows_digit_map = [{digit: [] for digit in range(1, 10)} for _ in range(9)]
-        cols_digit_map = [{digit: [] for digit in range(1, 10)} for _ in range(9)]
-        squares_digit_map = [{digit: [] for digit in range(1, 10)} for _ in range(9)]
-        for y in range(9):
-            for x in range(9):
-                cell = self.board[y][x]
-                if not isinstance(cell, list):
+        for unit_cells in self._links_index().unit_cells:
+            for digit, positions in unit_cells.items():
+                if len(positions) != 1:
                     continue
-                for digit in cell:
-                    rows_digit_map[y][digit].append((y, x))
-                    cols_digit_map[x][digit].append((y, x))
-                    square_index = (y // 3) * 3 + (x // 3)
-                    squares_digit_map[square_index][digit].append((y, x))
-        for digits_map in (rows_digit_map, cols_digit_map, squares_digit_map):
-            for digit_map in digits_map:
-                for digit, positions in digit_map.items():
-                    if len(positions) != 1:
-                        continue
-                    y, x = positions[0]
-                    self.board[y][x] = digit
-                    step: Step = {
-                        "type": "fill",
-                        "name": "Hidden Single",
-                        "digit": digit,
-                        "position": (y, x),
-                        "candidates_removed_positions": self._update_candidates_for_new_cell(
-                            y, x
-                        ),
-                    }
-                    self.steps.append(step)
-                    return True
+                y, x = next(iter(positions))
+                self._fill_cell(y, x, digit)
+                step: Step = {
+                    "type": "fill",
+                    "name": "Hidden Single",
+                    "digit": digit,
+                    "position": (y, x),
+                    "candidates_removed_positions": self._update_candidates_for_new_cell(
+                        y, x
+                    ),
+                }
+                self.steps.append(step)
+                return True
         return False
 
     def _naked_pair(self) -> bool:
@@ -188,7 +617,7 @@ class SudokuManager:
                 for digit in pair:
                     if digit not in self.board[curr_y][curr_x]:
                         continue
-                    self.board[curr_y][curr_x].remove(digit)
+                    self._remove_candidate(curr_y, curr_x, digit)
             return
 
         def append_step(
@@ -206,12 +635,12 @@ class SudokuManager:
             self.steps.append(step)
             return
 
-        candidate_pos_map = {digit: [] for digit in range(1, 10)}
-        rows_pairs_map = [{} for _ in range(9)]
-        cols_pairs_map = [{} for _ in range(9)]
-        squares_pairs_map = [{} for _ in range(9)]
-        for y in range(9):
-            for x in range(9):
+        candidate_pos_map = {digit: [] for digit in self.geometry.digits}
+        rows_pairs_map = [{} for _ in range(self.size)]
+        cols_pairs_map = [{} for _ in range(self.size)]
+        squares_pairs_map = [{} for _ in range(self.size)]
+        for y in range(self.size):
+            for x in range(self.size):
                 cell = self.board[y][x]
                 if not isinstance(cell, list):
                     continue
@@ -226,7 +655,7 @@ class SudokuManager:
                 if pair not in cols_pairs_map[x]:
                     cols_pairs_map[x][pair] = []
                 cols_pairs_map[x][pair].append((y, x))
-                square_index = (y // 3) * 3 + (x // 3)
+                square_index = self.geometry.square_of[y][x]
                 if pair not in squares_pairs_map[square_index]:
                     squares_pairs_map[square_index][pair] = []
                 squares_pairs_map[square_index][pair].append((y, x))
@@ -276,7 +705,7 @@ class SudokuManager:
                 candidate_positions = [
                     (y, x)
                     for (y, x) in candidate_positions
-                    if (y // 3) * 3 + (x // 3) == square_index
+                    if self.geometry.square_of[y][x] == square_index
                 ]
                 if len(candidate_positions) == 0:
                     continue
@@ -293,7 +722,7 @@ class SudokuManager:
                 for digit in triple:
                     if digit not in self.board[curr_y][curr_x]:
                         continue
-                    self.board[curr_y][curr_x].remove(digit)
+                    self._remove_candidate(curr_y, curr_x, digit)
             return
 
         def append_step(
@@ -311,12 +740,12 @@ class SudokuManager:
             self.steps.append(step)
             return
 
-        candidate_pos_map = {digit: [] for digit in range(1, 10)}
-        rows_triples_map = [{} for _ in range(9)]
-        cols_triples_map = [{} for _ in range(9)]
-        squares_triples_map = [{} for _ in range(9)]
-        for y in range(9):
-            for x in range(9):
+        candidate_pos_map = {digit: [] for digit in self.geometry.digits}
+        rows_triples_map = [{} for _ in range(self.size)]
+        cols_triples_map = [{} for _ in range(self.size)]
+        squares_triples_map = [{} for _ in range(self.size)]
+        for y in range(self.size):
+            for x in range(self.size):
                 cell = self.board[y][x]
                 if not isinstance(cell, list):
                     continue
@@ -331,7 +760,7 @@ class SudokuManager:
                 if triple not in cols_triples_map[x]:
                     cols_triples_map[x][triple] = []
                 cols_triples_map[x][triple].append((y, x))
-                square_index = (y // 3) * 3 + (x // 3)
+                square_index = self.geometry.square_of[y][x]
                 if triple not in squares_triples_map[square_index]:
                     squares_triples_map[square_index][triple] = []
                 squares_triples_map[square_index][triple].append((y, x))
@@ -384,7 +813,7 @@ class SudokuManager:
                 candidate_positions = [
                     (y, x)
                     for (y, x) in candidate_positions
-                    if (y // 3) * 3 + (x // 3) == square_index
+                    if self.geometry.square_of[y][x] == square_index
                 ]
                 if len(candidate_positions) == 0:
                     continue
@@ -394,10 +823,10 @@ class SudokuManager:
         return False
 
     def _pointing_pair_or_triple(self) -> bool:
-        for square_y in range(0, 9, 3):
-            for square_x in range(0, 9, 3):
+        for square_y in range(0, self.size, self.box):
+            for square_x in range(0, self.size, self.box):
                 square_coords = self._get_square_coords(square_y, square_x)
-                digit_positions = {digit: [] for digit in range(1, 10)}
+                digit_positions = {digit: [] for digit in self.geometry.digits}
                 for y, x in square_coords:
                     cell = self.board[y][x]
                     if not isinstance(cell, list):
@@ -410,7 +839,7 @@ class SudokuManager:
                         continue
                     y = rows.pop()
                     outside_positions = []
-                    for x in range(9):
+                    for x in range(self.size):
                         if (y, x) in square_coords:
                             continue
                         cell = self.board[y][x]
@@ -423,14 +852,14 @@ class SudokuManager:
                         continue
                     step: Step = {
                         "type": "reduce",
-                        "name": f"Pointing {"Pair" if len(positions) == 2 else "Triple"}",
+                        "name": f"Pointing {GROUP_NAMES[len(positions)]}",
                         "removed_digits": [digit],
                         "positions": positions,
                         "candidates_removed_positions": outside_positions,
                     }
                     self.steps.append(step)
                     for y, x in outside_positions:
-                        self.board[y][x].remove(digit)
+                        self._remove_candidate(y, x, digit)
                     return True
                 for digit, positions in digit_positions.items():
                     cols = {x for (_, x) in positions}
@@ -438,7 +867,7 @@ class SudokuManager:
                         continue
                     x = cols.pop()
                     outside_positions = []
-                    for y in range(9):
+                    for y in range(self.size):
                         if (y, x) in square_coords:
                             continue
                         cell = self.board[y][x]
@@ -451,22 +880,26 @@ class SudokuManager:
                         continue
                     step: Step = {
                         "type": "reduce",
-                        "name": f"Pointing {"Pair" if len(positions) == 2 else "Triple"}",
+                        "name": f"Pointing {GROUP_NAMES[len(positions)]}",
                         "removed_digits": [digit],
                         "positions": positions,
                         "candidates_removed_positions": outside_positions,
                     }
                     self.steps.append(step)
                     for y, x in outside_positions:
-                        self.board[y][x].remove(digit)
+                        self._remove_candidate(y, x, digit)
                     return True
         return False
 
     def _claiming_pair_or_triple(self) -> bool:
-        rows_digit_map = [{digit: [] for digit in range(1, 10)} for _ in range(9)]
-        cols_digit_map = [{digit: [] for digit in range(1, 10)} for _ in range(9)]
-        for y in range(9):
-            for x in range(9):
+        rows_digit_map = [
+            {digit: [] for digit in self.geometry.digits} for _ in range(self.size)
+        ]
+        cols_digit_map = [
+            {digit: [] for digit in self.geometry.digits} for _ in range(self.size)
+        ]
+        for y in range(self.size):
+            for x in range(self.size):
                 cell = self.board[y][x]
                 if not isinstance(cell, list):
                     continue
@@ -475,10 +908,10 @@ class SudokuManager:
                     cols_digit_map[x][digit].append(y)
         for y, digit_map in enumerate(rows_digit_map):
             for digit, cols in digit_map.items():
-                square_cols = {x // 3 for x in cols}
+                square_cols = {x // self.box for x in cols}
                 if len(square_cols) != 1:
                     continue
-                x = square_cols.pop() * 3
+                x = square_cols.pop() * self.box
                 positions = []
                 for curr_y, curr_x in self._get_square_coords(y, x):
                     if y == curr_y:
@@ -491,21 +924,21 @@ class SudokuManager:
                     continue
                 step: Step = {
                     "type": "reduce",
-                    "name": f"Claiming {"Pair" if len(cols) == 2 else "Triple"}",
+                    "name": f"Claiming {GROUP_NAMES[len(cols)]}",
                     "positions": [(y, curr_x) for curr_x in rows_digit_map[y][digit]],
                     "removed_digits": [digit],
                     "candidates_removed_positions": positions,
                 }
                 self.steps.append(step)
                 for curr_y, curr_x in positions:
-                    self.board[curr_y][curr_x].remove(digit)
+                    self._remove_candidate(curr_y, curr_x, digit)
                 return True
         for x, digit_map in enumerate(cols_digit_map):
             for digit, rows in digit_map.items():
-                square_rows = {y // 3 for y in rows}
+                square_rows = {y // self.box for y in rows}
                 if len(square_rows) != 1:
                     continue
-                y = square_rows.pop() * 3
+                y = square_rows.pop() * self.box
                 positions = []
                 for curr_y, curr_x in self._get_square_coords(y, x):
                     if x == curr_x:
@@ -518,13 +951,113 @@ class SudokuManager:
                     continue
                 step: Step = {
                     "type": "reduce",
-                    "name": f"Claiming {"Pair" if len(cols) == 2 else "Triple"}",
+                    "name": f"Claiming {GROUP_NAMES[len(rows)]}",
                     "positions": [(curr_y, x) for curr_y in cols_digit_map[x][digit]],
                     "removed_digits": [digit],
                     "candidates_removed_positions": positions,
                 }
                 self.steps.append(step)
                 for curr_y, curr_x in positions:
-                    self.board[curr_y][curr_x].remove(digit)
+                    self._remove_candidate(curr_y, curr_x, digit)
                 return True
         return False
+
+    def _links_index(self) -> StrongLinkIndex:
+        if self.links is None:
+            self.links = StrongLinkIndex(self.board)
+        return self.links
+
+    def _simple_coloring(self) -> bool:
+        links = self._links_index()
+        for digit in self.geometry.digits:
+            graph: dict[tuple[int, int], list[tuple[int, int]]] = {}
+            for _, (a, b) in sorted(links.links[digit].items()):
+                graph.setdefault(a, []).append(b)
+                graph.setdefault(b, []).append(a)
+            colors: dict[tuple[int, int], int] = {}
+            for start in graph:
+                if start in colors:
+                    continue
+                chain = [start]
+                colors[start] = 0
+                for cell in chain:
+                    for neighbour in graph[cell]:
+                        if neighbour not in colors:
+                            colors[neighbour] = 1 - colors[cell]
+                            chain.append(neighbour)
+                if len(chain) < 3:
+                    continue
+                groups = (
+                    [cell for cell in chain if colors[cell] == 0],
+                    [cell for cell in chain if colors[cell] == 1],
+                )
+                removed_positions = []
+                for color, group in enumerate(groups):
+                    if any(self.geometry.sees(a, b) for a in group for b in group):
+                        removed_positions = group
+                        positions = groups[1 - color]
+                        break
+                else:
+                    positions = chain
+                    removed_positions = [
+                        cell
+                        for cell in sorted(links.cells_with(digit))
+                        if cell not in colors
+                        and any(self.geometry.sees(cell, other) for other in groups[0])
+                        and any(self.geometry.sees(cell, other) for other in groups[1])
+                    ]
+                if len(removed_positions) == 0:
+                    continue
+                step: Step = {
+                    "type": "reduce",
+                    "name": "Simple Coloring",
+                    "positions": positions,
+                    "removed_digits": [digit],
+                    "candidates_removed_positions": removed_positions,
+                }
+                self.steps.append(step)
+                for y, x in removed_positions:
+                    self._remove_candidate(y, x, digit)
+                return True
+        return False
+
+    def _xy_wing(self) -> bool:
+        links = self._links_index()
+        bivalue = sorted(links.bivalue)
+        for pivot in bivalue:
+            a, b = self.board[pivot[0]][pivot[1]]
+            wings = [
+                cell
+                for cell in bivalue
+                if self.geometry.sees(pivot, cell)
+                and len(set(self.board[cell[0]][cell[1]]) & {a, b}) == 1
+            ]
+            for first in wings:
+                first_cell = self.board[first[0]][first[1]]
+                if a not in first_cell:
+                    continue
+                digit = first_cell[0] if first_cell[1] == a else first_cell[1]
+                for second in wings:
+                    if set(self.board[second[0]][second[1]]) != {b, digit}:
+                        continue
+                    removed_positions = [
+                        cell
+                        for cell in sorted(links.cells_with(digit))
+                        if cell not in (pivot, first, second)
+                        and self.geometry.sees(cell, first)
+                        and self.geometry.sees(cell, second)
+                    ]
+                    if len(removed_positions) == 0:
+                        continue
+                    step: Step = {
+                        "type": "reduce",
+                        "name": "XY-Wing",
+                        "positions": [pivot, first, second],
+                        "removed_digits": [digit],
+                        "candidates_removed_positions": removed_positions,
+                    }
+                    self.steps.append(step)
+                    for y, x in removed_positions:
+                        self._remove_candidate(y, x, digit)
+                    return True
+        return False
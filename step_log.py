@@ -0,0 +1,300 @@
+from array import array
+from collections.abc import Iterator, Mapping
+import json
+from type_defs import Step
+
+FILL = 0
+REDUCE = 1
+WAVE = 2
+
+FILL_KEYS = ("type", "name", "position", "digit", "candidates_removed_positions")
+REDUCE_KEYS = (
+    "type",
+    "name",
+    "positions",
+    "removed_digits",
+    "candidates_removed_positions",
+)
+WAVE_KEYS = ("type", "name", "positions", "digits")
+KIND_NAMES = ("fill", "reduce", "wave")
+KIND_KEYS = (FILL_KEYS, REDUCE_KEYS, WAVE_KEYS)
+
+MASK_DIGITS = [
+    [digit for digit in range(1, 10) if mask >> digit & 1] for mask in range(1 << 10)
+]
+cell_positions: dict[int, list[tuple[int, int]]] = {}
+cell_json: dict[int, list[str]] = {}
+
+
+def mask_digits(mask: int) -> list[int]:
+    if mask < len(MASK_DIGITS):
+        return MASK_DIGITS[mask].copy()
+    return [digit for digit in range(1, mask.bit_length()) if mask >> digit & 1]
+
+
+def positions_table(size: int) -> list[tuple[int, int]]:
+    positions = cell_positions.get(size)
+    if positions is None:
+        positions = cell_positions[size] = [
+            divmod(cell, size) for cell in range(size * size)
+        ]
+    return positions
+
+
+def positions_json(size: int) -> list[str]:
+    table = cell_json.get(size)
+    if table is None:
+        table = cell_json[size] = [f"[{y}, {x}]" for y, x in positions_table(size)]
+    return table
+
+
+class StepLog:
+    """Append-only trace of solving steps stored as parallel arrays.
+
+    Every step takes one slot in each of the per-step arrays; the cells it
+    references are packed as `y * size + x` into one shared buffer, addressed
+    through `_offsets` (two entries per step: start of `positions`, start of
+    `candidates_removed_positions`, the next step's start closing the range).
+    A wave keeps its filled cells in the first range and their digits in the
+    second.
+    """
+
+    __slots__ = (
+        "_size",
+        "_positions",
+        "_names",
+        "_name_ids",
+        "_kinds",
+        "_technique_ids",
+        "_targets",
+        "_digit_masks",
+        "_offsets",
+        "_cells",
+    )
+
+    def __init__(self, steps: list[Step] | None = None, size: int = 9):
+        self._size = size
+        self._positions = positions_table(size)
+        self._names: list[str] = []
+        self._name_ids: dict[str, int] = {}
+        self._kinds = array("B")
+        self._technique_ids = array("B")
+        self._targets = array("h")
+        self._digit_masks = array("I")
+        self._offsets = array("I", [0])
+        self._cells = array("H")
+        if steps is not None:
+            self.extend(steps)
+
+    def append(self, step: Step):
+        name = step["name"]
+        technique_id = self._name_ids.get(name)
+        if technique_id is None:
+            technique_id = len(self._names)
+            self._names.append(name)
+            self._name_ids[name] = technique_id
+        self._technique_ids.append(technique_id)
+        cells = self._cells
+        size = self._size
+        if step["type"] == "fill":
+            y, x = step["position"]
+            self._kinds.append(FILL)
+            self._targets.append(y * size + x)
+            self._digit_masks.append(1 << step["digit"])
+        elif step["type"] == "wave":
+            self._kinds.append(WAVE)
+            self._targets.append(-1)
+            self._digit_masks.append(0)
+            cells.extend(y * size + x for (y, x) in step["positions"])
+            self._offsets.append(len(cells))
+            cells.extend(step["digits"])
+            self._offsets.append(len(cells))
+            return
+        else:
+            self._kinds.append(REDUCE)
+            self._targets.append(-1)
+            mask = 0
+            for digit in step["removed_digits"]:
+                mask |= 1 << digit
+            self._digit_masks.append(mask)
+            cells.extend(y * size + x for (y, x) in step["positions"])
+        self._offsets.append(len(cells))
+        cells.extend(y * size + x for (y, x) in step["candidates_removed_positions"])
+        self._offsets.append(len(cells))
+
+    def extend(self, steps: list[Step]):
+        for step in steps:
+            self.append(step)
+
+    def __len__(self) -> int:
+        return len(self._kinds)
+
+    def __getitem__(self, index: int) -> "StepView":
+        length = len(self._kinds)
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError("step index out of range")
+        return StepView(self, index)
+
+    def __iter__(self) -> Iterator["StepView"]:
+        for index in range(len(self._kinds)):
+            yield StepView(self, index)
+
+    def nbytes(self) -> int:
+        return sum(
+            buffer.itemsize * len(buffer)
+            for buffer in (
+                self._kinds,
+                self._technique_ids,
+                self._targets,
+                self._digit_masks,
+                self._offsets,
+                self._cells,
+            )
+        )
+
+    def to_list(self, start: int = 0) -> list[Step]:
+        steps = []
+        names = self._names
+        offsets, cells, digits = self._decode_from(start, self._positions)
+        positions = self._positions
+        for index, (kind, technique_id, target, mask) in enumerate(
+            zip(
+                self._kinds[start:],
+                self._technique_ids[start:],
+                self._targets[start:],
+                self._digit_masks[start:],
+            )
+        ):
+            first, middle, end = offsets[2 * index : 2 * index + 3]
+            if kind == FILL:
+                steps.append(
+                    {
+                        "type": "fill",
+                        "name": names[technique_id],
+                        "position": positions[target],
+                        "digit": mask.bit_length() - 1,
+                        "candidates_removed_positions": cells[middle:end],
+                    }
+                )
+                continue
+            if kind == WAVE:
+                steps.append(
+                    {
+                        "type": "wave",
+                        "name": names[technique_id],
+                        "positions": cells[first:middle],
+                        "digits": digits[middle:end],
+                    }
+                )
+                continue
+            steps.append(
+                {
+                    "type": "reduce",
+                    "name": names[technique_id],
+                    "positions": cells[first:middle],
+                    "removed_digits": mask_digits(mask),
+                    "candidates_removed_positions": cells[middle:end],
+                }
+            )
+        return steps
+
+    def to_json(self, start: int = 0) -> str:
+        """`json.dumps(self.to_list(start))`, written straight from the
+        arrays without building the step dicts."""
+        steps = []
+        names = [json.dumps(name) for name in self._names]
+        positions = positions_json(self._size)
+        offsets, cells, digits = self._decode_from(start, positions)
+        for index, (kind, technique_id, target, mask) in enumerate(
+            zip(
+                self._kinds[start:],
+                self._technique_ids[start:],
+                self._targets[start:],
+                self._digit_masks[start:],
+            )
+        ):
+            first, middle, end = offsets[2 * index : 2 * index + 3]
+            name = names[technique_id]
+            if kind == FILL:
+                steps.append(
+                    f'{{"type": "fill", "name": {name},'
+                    f' "position": {positions[target]},'
+                    f' "digit": {mask.bit_length() - 1},'
+                    f' "candidates_removed_positions":'
+                    f' [{", ".join(cells[middle:end])}]}}'
+                )
+            elif kind == WAVE:
+                steps.append(
+                    f'{{"type": "wave", "name": {name},'
+                    f' "positions": [{", ".join(cells[first:middle])}],'
+                    f' "digits": {digits[middle:end]}}}'
+                )
+            else:
+                steps.append(
+                    f'{{"type": "reduce", "name": {name},'
+                    f' "positions": [{", ".join(cells[first:middle])}],'
+                    f' "removed_digits": {mask_digits(mask)},'
+                    f' "candidates_removed_positions":'
+                    f' [{", ".join(cells[middle:end])}]}}'
+                )
+        return f"[{", ".join(steps)}]"
+
+    def _decode_from(self, start: int, table: list) -> tuple[list, list, list]:
+        """The offsets of the steps from `start` on, rebased to their first
+        cell, and the cells they reference, mapped through `table` and raw."""
+        start = min(start, len(self._kinds))
+        offsets = self._offsets[2 * start :].tolist()
+        base = offsets[0]
+        raw = self._cells[base:].tolist()
+        return [offset - base for offset in offsets], [table[cell] for cell in raw], raw
+
+
+class StepView(Mapping):
+    """Read-only `FillStep` / `ReduceStep` lookalike backed by a `StepLog`."""
+
+    __slots__ = ("_log", "_index")
+
+    def __init__(self, log: StepLog, index: int):
+        self._log = log
+        self._index = index
+
+    def __getitem__(self, key: str):
+        log = self._log
+        index = self._index
+        kind = log._kinds[index]
+        fill = kind == FILL
+        match key:
+            case "type":
+                return KIND_NAMES[kind]
+            case "name":
+                return log._names[log._technique_ids[index]]
+            case "position" if fill:
+                return log._positions[log._targets[index]]
+            case "digit" if fill:
+                return log._digit_masks[index].bit_length() - 1
+            case "positions" if not fill:
+                start, end = log._offsets[2 * index], log._offsets[2 * index + 1]
+                return [log._positions[cell] for cell in log._cells[start:end]]
+            case "removed_digits" if kind == REDUCE:
+                return mask_digits(log._digit_masks[index])
+            case "digits" if kind == WAVE:
+                start, end = log._offsets[2 * index + 1], log._offsets[2 * index + 2]
+                return log._cells[start:end].tolist()
+            case "candidates_removed_positions" if kind != WAVE:
+                start, end = log._offsets[2 * index + 1], log._offsets[2 * index + 2]
+                return [log._positions[cell] for cell in log._cells[start:end]]
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._keys())
+
+    def __len__(self) -> int:
+        return len(self._keys())
+
+    def __repr__(self) -> str:
+        return repr(dict(self))
+
+    def _keys(self) -> tuple[str, ...]:
+        return KIND_KEYS[self._log._kinds[self._index]]
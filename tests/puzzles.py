@@ -0,0 +1,92 @@
+"""Seeded puzzle fixtures shared by the tests."""
+
+import random
+import methods
+
+
+def solved_grid(box: int, rng: random.Random) -> list:
+    """A pattern-filled solved grid with shuffled bands, rows, stacks,
+    columns and digits."""
+    size = box * box
+    rows = [
+        band * box + row
+        for band in rng.sample(range(box), box)
+        for row in rng.sample(range(box), box)
+    ]
+    cols = [
+        stack * box + col
+        for stack in rng.sample(range(box), box)
+        for col in rng.sample(range(box), box)
+    ]
+    digits = rng.sample(range(1, size + 1), size)
+    return [
+        [digits[(box * (y % box) + y // box + x) % size] for x in cols] for y in rows
+    ]
+
+
+def minimal_puzzle(box: int, rng: random.Random) -> tuple[list, list]:
+    """Clears the cells of a solved grid in random order, keeping each clue
+    whose removal would make the solution ambiguous."""
+    solution = solved_grid(box, rng)
+    puzzle = [row.copy() for row in solution]
+    cells = [(y, x) for y in range(len(solution)) for x in range(len(solution))]
+    rng.shuffle(cells)
+    for y, x in cells:
+        digit = puzzle[y][x]
+        puzzle[y][x] = None
+        if methods.count_solutions(puzzle) != 1:
+            puzzle[y][x] = digit
+    return puzzle, solution
+
+
+def solvable_puzzle(box: int, givens: float, rng: random.Random) -> tuple[list, list]:
+    """Keeps about `givens` of a solved grid's cells, then restores clues
+    until the logical solver can finish it. Cheap for any grid size."""
+    solution = solved_grid(box, rng)
+    puzzle = [
+        [cell if rng.random() < givens else None for cell in row] for row in solution
+    ]
+    while True:
+        sudoku = methods.SudokuManager(puzzle)
+        sudoku.logic_solve()
+        stuck = [
+            (y, x)
+            for y, row in enumerate(sudoku.board)
+            for x, cell in enumerate(row)
+            if isinstance(cell, list)
+        ]
+        if len(stuck) == 0:
+            return puzzle, solution
+        y, x = rng.choice(stuck)
+        puzzle[y][x] = solution[y][x]
+
+
+def shuffled_puzzle(board: list, rng: random.Random) -> list:
+    """A 9x9 board under a random symmetry: band, row, stack and column
+    permutations, transposition and digit relabelling."""
+    digits = rng.sample(range(1, 10), 9)
+    rows = [
+        band * 3 + row
+        for band in rng.sample(range(3), 3)
+        for row in rng.sample(range(3), 3)
+    ]
+    cols = [
+        stack * 3 + col
+        for stack in rng.sample(range(3), 3)
+        for col in rng.sample(range(3), 3)
+    ]
+    shuffled = [[board[y][x] for x in cols] for y in rows]
+    if rng.random() < 0.5:
+        shuffled = [list(row) for row in zip(*shuffled)]
+    return [
+        [None if cell is None else digits[cell - 1] for cell in row] for row in shuffled
+    ]
+
+
+def resume(board: list) -> methods.SudokuManager:
+    """A solver resuming from `board`, a board with candidate lists."""
+    sudoku = methods.SudokuManager(
+        [[cell if isinstance(cell, int) else None for cell in row] for row in board]
+    )
+    sudoku._candidates_board(board)
+    return sudoku
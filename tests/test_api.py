@@ -0,0 +1,95 @@
+from concurrent.futures import ThreadPoolExecutor
+import os
+import random
+import tempfile
+import unittest
+from unittest import mock
+import api
+import cache
+from puzzles import solvable_puzzle, solved_grid
+
+
+def echo(payload: dict) -> dict:
+    return {"value": payload["value"] * 2}
+
+
+class MicroBatcherTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        path = os.path.join(self.directory.name, "cache.sqlite3")
+        self.shared_cache = cache.shared_cache
+        cache.shared_cache = cache.SharedCache(path)
+        self.executor = ThreadPoolExecutor(1)
+        self.batcher = api.MicroBatcher(self.executor, 0.05, 64)
+
+    def tearDown(self):
+        # Connections are per thread, so close the pool thread's one there.
+        self.executor.submit(cache.shared_cache.close).result()
+        self.executor.shutdown()
+        cache.shared_cache.close()
+        cache.shared_cache = self.shared_cache
+        self.directory.cleanup()
+
+    def test_each_request_gets_its_own_answer(self):
+        payloads = [
+            {"value": 1},
+            {"value": "a"},
+            {},
+            {"value": None},
+            {"value": 4},
+        ]
+        with mock.patch.dict(api.HANDLERS, {"echo": echo}):
+            futures = [self.batcher.submit("echo", payload) for payload in payloads]
+            results = [future.result(timeout=5) for future in futures]
+        self.assertEqual(
+            [result[:2] for result in results],
+            [
+                (True, {"value": 2}),
+                (True, {"value": "aa"}),
+                (False, "KeyError: 'value'"),
+                (
+                    False,
+                    "TypeError: unsupported operand type(s) for *: 'NoneType' and 'int'",
+                ),
+                (True, {"value": 8}),
+            ],
+        )
+        self.assertEqual({result[4] for result in results}, {len(payloads)})
+
+    def test_invalid_boards_fail_alone(self):
+        rng = random.Random(0)
+        puzzle, solution = solvable_puzzle(3, 0.4, rng)
+        futures = [
+            self.batcher.submit("solve", {"board": puzzle}),
+            self.batcher.submit("solve", {"board": [[1]]}),
+            self.batcher.submit("grade", {"board": solution}),
+            self.batcher.submit("grade", {"board": [[None] * 4] * 4}),
+        ]
+        results = [future.result(timeout=30) for future in futures]
+        self.assertTrue(results[0][0])
+        self.assertEqual(results[0][1]["board"], solution)
+        self.assertEqual(
+            results[1][:2], (False, "board must be a 4x4, 9x9, 16x16 or 25x25 grid")
+        )
+        self.assertEqual(results[2][1]["grade"], "solved")
+        self.assertEqual(results[3][1]["grade"], "unsolved")
+
+    def test_cancelled_requests_are_dropped(self):
+        batcher = api.MicroBatcher(self.executor, 0.2, 64)
+        with mock.patch.dict(api.HANDLERS, {"echo": echo}):
+            futures = [batcher.submit("echo", {"value": value}) for value in range(3)]
+            self.assertTrue(futures[1].cancel())
+            first, last = futures[0].result(timeout=5), futures[2].result(timeout=5)
+        self.assertEqual((first[1], last[1]), ({"value": 0}, {"value": 4}))
+        self.assertEqual((first[4], last[4]), (2, 2))
+        self.assertTrue(futures[1].cancelled())
+
+    def test_grade_levels(self):
+        board = solved_grid(3, random.Random(0))
+        self.assertEqual(api.grade({"board": board})["grade"], "solved")
+        board[0][0] = None
+        self.assertEqual(api.grade({"board": board})["grade"], "easy")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+import random
+import unittest
+import cache
+import canonical
+import methods
+from canonical import canonicalize
+from puzzles import shuffled_puzzle, solvable_puzzle, solved_grid
+
+
+class CanonicalTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        rng = random.Random(0)
+        cls.puzzles = [solvable_puzzle(3, 0.35, rng)[0] for _ in range(10)]
+        cls.rng = rng
+
+    def test_fingerprint_is_invariant(self):
+        for puzzle in self.puzzles:
+            board, fingerprint, _ = canonicalize(puzzle)
+            for _ in range(5):
+                other, other_fingerprint, _ = canonicalize(
+                    shuffled_puzzle(puzzle, self.rng)
+                )
+                self.assertEqual(other_fingerprint, fingerprint)
+                self.assertEqual(other, board)
+
+    def test_transform_round_trips(self):
+        for puzzle in self.puzzles:
+            shuffled = shuffled_puzzle(puzzle, self.rng)
+            board, _, transform = canonicalize(shuffled)
+            self.assertEqual(transform.board_to_original(board), shuffled)
+            self.assertEqual(transform.board_to_canonical(shuffled), board)
+
+    def test_mapped_trace_replays(self):
+        for puzzle in self.puzzles:
+            shuffled = shuffled_puzzle(puzzle, self.rng)
+            board, _, transform = canonicalize(shuffled)
+            sudoku = methods.SudokuManager(board)
+            sudoku.logic_solve()
+            trace = cache.map_trace(cache._trace(sudoku), transform)
+            direct = methods.SudokuManager(shuffled)
+            direct.logic_solve()
+            self.assertEqual(trace["puzzle"], direct.puzzle)
+            self.assertEqual(trace["board"], direct.board)
+            replay = methods.ReversibleBoard(trace["puzzle"])
+            replay.seek(trace["steps"], len(trace["steps"]))
+            self.assertEqual(replay.board, direct.board)
+
+    def test_search_is_capped(self):
+        # Every row of a complete grid ties for the first row, so the search
+        # would keep over 20,000 states.
+        grid = solved_grid(3, self.rng)
+        self.assertIsNone(canonicalize(grid))
+        self.assertIsNotNone(canonicalize(grid, max_states=50_000))
+
+    def test_complete_grids_are_keyed_by_givens(self):
+        grid = solved_grid(3, self.rng)
+        board, key, transform = cache._trace_key(grid, False)
+        self.assertIs(board, grid)
+        self.assertEqual(key, cache.board_key(grid))
+        self.assertIsNone(transform)
+        grid[4][4] = None
+        self.assertIsNotNone(cache._trace_key(grid, False)[2])
+
+    def test_puzzles_stay_under_the_cap(self):
+        for puzzle in self.puzzles:
+            self.assertIsNotNone(canonicalize(puzzle, canonical.MAX_STATES // 4))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import random
+import unittest
+import methods
+from puzzles import minimal_puzzle, resume, solvable_puzzle
+
+
+class SolverTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        rng = random.Random(0)
+        cls.puzzles = [minimal_puzzle(3, rng) for _ in range(20)]
+        cls.puzzles += [minimal_puzzle(2, rng) for _ in range(5)]
+        cls.puzzles += [solvable_puzzle(4, 0.45, rng) for _ in range(2)]
+
+    def assert_keeps_solution(self, step, solution):
+        if step["type"] == "fill":
+            y, x = step["position"]
+            self.assertEqual(step["digit"], solution[y][x], step)
+        else:
+            for y, x in step["candidates_removed_positions"]:
+                self.assertNotIn(solution[y][x], step["removed_digits"], step)
+
+    def test_steps_keep_solution(self):
+        for puzzle, solution in self.puzzles:
+            sudoku = methods.SudokuManager(puzzle)
+            sudoku.logic_solve()
+            for step in sudoku.steps:
+                self.assert_keeps_solution(step, solution)
+
+    def test_each_technique_keeps_solution(self):
+        """Runs every technique on every intermediate board, not only the
+        first one that applies, so chains and wings are exercised too. Like
+        the solver, each one only sees boards without pending singles."""
+        found = {}
+        for puzzle, solution in self.puzzles[:20]:
+            sudoku = methods.SudokuManager(puzzle)
+            sudoku.logic_solve()
+            steps = sudoku.steps.to_list()
+            board = methods.ReversibleBoard(sudoku.puzzle)
+            for applied in range(len(steps) + 1):
+                board.seek(steps, applied)
+                singles = resume(board.board)
+                while singles.solving_methods[0]() or singles.solving_methods[1]():
+                    pass
+                for index in range(2, len(singles.solving_methods)):
+                    technique = resume(singles.board)
+                    technique.solving_methods[index]()
+                    for step in [*singles.steps, *technique.steps]:
+                        self.assert_keeps_solution(step, solution)
+                        found[step["name"]] = found.get(step["name"], 0) + 1
+        self.assertGreater(found.get("Simple Coloring", 0), 0)
+        self.assertGreater(found.get("XY-Wing", 0), 0)
+
+    def test_links_match_rebuilt_index(self):
+        for puzzle, _ in self.puzzles:
+            sudoku = methods.SudokuManager(puzzle)
+            sudoku.logic_solve()
+            links = sudoku._links_index()
+            rebuilt = methods.StrongLinkIndex(sudoku.board)
+            self.assertEqual(links.unit_cells, rebuilt.unit_cells)
+            self.assertEqual(links.links, rebuilt.links)
+            self.assertEqual(links.bivalue, rebuilt.bivalue)
+
+    def test_seek_restores_puzzle(self):
+        rng = random.Random(1)
+        for puzzle, _ in self.puzzles:
+            sudoku = methods.SudokuManager(puzzle)
+            sudoku.logic_solve()
+            steps = sudoku.steps.to_list()
+            board = methods.ReversibleBoard(sudoku.puzzle)
+            for applied in rng.sample(range(len(steps) + 1), min(5, len(steps) + 1)):
+                board.seek(steps, applied, partial=rng.random() < 0.5)
+                fresh = methods.ReversibleBoard(sudoku.puzzle)
+                fresh.seek(steps, applied, partial=board._partial)
+                self.assertEqual(board.board, fresh.board)
+            board.seek(steps, len(steps))
+            self.assertEqual(board.board, sudoku.board)
+            board.seek(steps, 0)
+            self.assertEqual(board.board, sudoku.puzzle)
+
+
+if __name__ == "__main__":
+    unittest.main()
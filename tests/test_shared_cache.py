@@ -0,0 +1,74 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+import cache
+
+
+class SharedCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "cache.sqlite3")
+        self.version = cache.TRACE_VERSION
+        self.caches = []
+
+    def tearDown(self):
+        for shared_cache in self.caches:
+            shared_cache.close()
+        cache.TRACE_VERSION = self.version
+        self.directory.cleanup()
+
+    def open(self, version: int = 1, max_traces: int = 100) -> cache.SharedCache:
+        cache.TRACE_VERSION = version
+        shared_cache = cache.SharedCache(self.path, max_traces)
+        self.caches.append(shared_cache)
+        return shared_cache
+
+    def tables(self) -> set[str]:
+        with sqlite3.connect(self.path) as connection:
+            rows = connection.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table'"
+            ).fetchall()
+        connection.close()
+        return {name for (name,) in rows}
+
+    def test_keeps_most_recently_written_traces(self):
+        shared_cache = self.open(max_traces=3)
+        for key in "abc":
+            shared_cache.put_trace(key, f'"{key}"')
+        # Rewriting "a" makes it the newest, so "b" is evicted first.
+        shared_cache.put_trace("a", '"a2"')
+        shared_cache.put_trace("d", '"d"')
+        self.assertIsNone(shared_cache.get_trace("b"))
+        self.assertEqual(shared_cache.get_trace("a"), "a2")
+        self.assertEqual(shared_cache.get_trace("c"), "c")
+        self.assertEqual(shared_cache.get_trace("d"), "d")
+        shared_cache.put_trace("e", '"e"')
+        self.assertIsNone(shared_cache.get_trace("c"))
+
+    def test_versions_are_isolated(self):
+        old = self.open(version=1)
+        old.put_trace("key", '"old"')
+        new = self.open(version=2)
+        self.assertIsNone(new.get_trace("key"))
+        new.put_trace("key", '"new"')
+        # Opening the new version leaves the old workers' table alone.
+        self.assertEqual(old.get_trace("key"), "old")
+        self.assertEqual(new.get_trace("key"), "new")
+        self.assertEqual(new.drop_other_versions(), ["traces_v1"])
+        self.assertNotIn("traces_v1", self.tables())
+        self.assertEqual(new.get_trace("key"), "new")
+
+    def test_survives_a_dropped_table(self):
+        old = self.open(version=1)
+        old.put_trace("key", '"old"')
+        old.push_puzzle("puzzle")
+        self.open(version=2).drop_other_versions()
+        self.assertIsNone(old.get_trace("key"))
+        old.put_trace("key", '"again"')
+        self.assertEqual(old.get_trace("key"), "again")
+        self.assertEqual(old.pop_puzzle(), "puzzle")
+
+
+if __name__ == "__main__":
+    unittest.main()
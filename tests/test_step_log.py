@@ -0,0 +1,41 @@
+import json
+import random
+import unittest
+import methods
+from puzzles import solvable_puzzle
+from step_log import StepLog
+
+
+class StepLogTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        rng = random.Random(0)
+        cls.traces = []
+        for box, givens in ((2, 0.3), (3, 0.3), (4, 0.45), (5, 0.55)):
+            puzzle, _ = solvable_puzzle(box, givens, rng)
+            for waves in (False, True):
+                sudoku = methods.SudokuManager(puzzle, waves)
+                sudoku.logic_solve()
+                cls.traces.append((sudoku.size, sudoku.steps.to_list()))
+
+    def test_round_trip(self):
+        for size, steps in self.traces:
+            log = StepLog(steps, size)
+            self.assertEqual(log.to_list(), steps)
+            self.assertEqual([dict(step) for step in log], steps)
+
+    def test_to_list_from_start(self):
+        for size, steps in self.traces:
+            log = StepLog(steps, size)
+            for start in (0, 1, len(steps) // 2, len(steps), len(steps) + 1):
+                self.assertEqual(log.to_list(start), steps[start:])
+
+    def test_to_json_matches_dumps(self):
+        for size, steps in self.traces:
+            log = StepLog(steps, size)
+            for start in (0, len(steps) // 2, len(steps)):
+                self.assertEqual(log.to_json(start), json.dumps(steps[start:]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+import json
+import os
+import random
+import tempfile
+import unittest
+import cache
+import main
+from puzzles import minimal_puzzle, solvable_puzzle
+
+
+def plain(value):
+    """`value` as it reads after a JSON round trip (tuples become lists)."""
+    return json.loads(json.dumps(value))
+
+
+class StreamTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        path = os.path.join(self.directory.name, "cache.sqlite3")
+        self.shared_cache = cache.shared_cache
+        cache.shared_cache = cache.SharedCache(path)
+        self.interval = cache.STREAM_INTERVAL
+        # Flush every technique's steps as its own batch.
+        cache.STREAM_INTERVAL = 0
+        self.rng = random.Random(0)
+
+    def tearDown(self):
+        cache.shared_cache.close()
+        cache.shared_cache = self.shared_cache
+        cache.STREAM_INTERVAL = self.interval
+        self.directory.cleanup()
+
+    def puzzles(self):
+        yield minimal_puzzle(3, self.rng)[0]
+        yield solvable_puzzle(3, 0.3, self.rng)[0]
+        yield solvable_puzzle(4, 0.45, self.rng)[0]
+
+    def test_stream_from_start_matches_solve(self):
+        for puzzle in self.puzzles():
+            streamed = list(cache.stream_trace(puzzle, waves=True))
+            self.assertGreater(len(streamed), 1)
+            expected = cache.solve_trace(puzzle, waves=True)["steps"]
+            self.assertEqual(
+                plain([step for batch in streamed for step in batch]), plain(expected)
+            )
+
+    def test_resume_without_cached_trace(self):
+        for puzzle in self.puzzles():
+            expected = plain(cache.solve_trace(puzzle, waves=True)["steps"])
+            for start in (1, len(expected) // 2, len(expected)):
+                cache.shared_cache.close()
+                cache.shared_cache = cache.SharedCache(
+                    os.path.join(self.directory.name, f"{start}.sqlite3")
+                )
+                steps = [
+                    step
+                    for batch in cache.stream_trace(puzzle, waves=True, start=start)
+                    for step in batch
+                ]
+                self.assertEqual(plain(steps), expected[start:])
+
+    def test_resume_with_cached_trace(self):
+        for puzzle in self.puzzles():
+            expected = plain(cache.solve_trace(puzzle, waves=True)["steps"])
+            for start in (1, len(expected) // 2, len(expected)):
+                batches = list(cache.stream_trace(puzzle, waves=True, start=start))
+                self.assertEqual(len(batches), 1)
+                self.assertEqual(plain(batches[0]), expected[start:])
+
+    def test_reconnect_continues_the_trace(self):
+        for puzzle in self.puzzles():
+            received = []
+            for batch in cache.stream_trace(puzzle, waves=True):
+                received.extend(batch)
+                break
+            # The dropped stream never finished, so nothing was cached.
+            self.assertIsNone(cache.cached_trace(puzzle, waves=True))
+            for batch in cache.stream_trace(puzzle, waves=True, start=len(received)):
+                received.extend(batch)
+            self.assertEqual(
+                plain(received), plain(cache.solve_trace(puzzle, waves=True)["steps"])
+            )
+
+
+class StreamRouteTest(unittest.TestCase):
+    def setUp(self):
+        self.client = main.server.test_client()
+
+    def test_rejects_malformed_requests(self):
+        for query in (
+            "puzzle=" + "." * 80,
+            "puzzle=" + "." * 25,
+            "puzzle=x" + "." * 80,
+            "puzzle=A" + "." * 80,
+            "puzzle=11" + "." * 79,
+            "puzzle=" + "." * 81 + "&start=-1",
+            "puzzle=" + "." * 81 + "&start=one",
+        ):
+            response = self.client.get(f"/stream/solve?{query}")
+            self.assertEqual(response.status_code, 400, query)
+
+
+if __name__ == "__main__":
+    unittest.main()
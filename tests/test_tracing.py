@@ -0,0 +1,55 @@
+import unittest
+import tracing
+
+
+class TracingTest(unittest.TestCase):
+    def setUp(self):
+        self.recorder = tracing.recorder
+        tracing.recorder = tracing.Recorder(4)
+
+    def tearDown(self):
+        tracing.recorder = self.recorder
+
+    def test_renders_span_summaries(self):
+        for duration in (0.4, 0.1, 0.3, 0.2, 0.5):
+            tracing.recorder.record("solve", "logic", duration, 10)
+        tracing.recorder.record("solve", "logic", 0.05, None)
+        lines = tracing.render_metrics().splitlines()
+        labels = 'kind="solve",name="logic"'
+        # The ring keeps the last four durations; sums and counts cover all.
+        for quantile, value in (("0.5", "0.3"), ("0.95", "0.5"), ("0.99", "0.5")):
+            self.assertIn(
+                f'sudoku_span_duration_seconds{{{labels},quantile="{quantile}"}}'
+                f" {value}",
+                lines,
+            )
+        self.assertIn(f"sudoku_span_duration_seconds_sum{{{labels}}} 1.55", lines)
+        self.assertIn(f"sudoku_span_duration_seconds_count{{{labels}}} 6", lines)
+        self.assertIn(f'sudoku_span_payload_size{{{labels},quantile="0.5"}} 10', lines)
+        self.assertIn(f"sudoku_span_payload_size_sum{{{labels}}} 50", lines)
+        self.assertIn(f"sudoku_span_payload_size_count{{{labels}}} 5", lines)
+
+    def test_renders_counters(self):
+        tracing.count("sudoku_cache_hits_total")
+        tracing.count("sudoku_cache_hits_total", 2)
+        lines = tracing.render_metrics().splitlines()
+        index = lines.index("# TYPE sudoku_cache_hits_total counter")
+        self.assertEqual(lines[index + 1], "sudoku_cache_hits_total 3")
+
+    def test_replays_captured_spans_and_counts(self):
+        with tracing.capture() as captured:
+            with tracing.span("api", "solve", 7):
+                pass
+            tracing.count("sudoku_api_errors_total")
+        tracing.count("sudoku_api_errors_total")
+        self.assertEqual(captured.counts, {"sudoku_api_errors_total": 1})
+        self.assertEqual([span[:2] for span in captured.spans], [("api", "solve")])
+        tracing.recorder = tracing.Recorder(4)
+        tracing.replay(captured.spans, captured.counts)
+        series, counters = tracing.recorder.snapshot()
+        self.assertEqual(series[("api", "solve")].sizes[0], 7)
+        self.assertEqual(counters, {"sudoku_api_errors_total": 1})
+
+
+if __name__ == "__main__":
+    unittest.main()
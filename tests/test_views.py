@@ -0,0 +1,99 @@
+import random
+import unittest
+import cache
+import main
+import methods
+from puzzles import solvable_puzzle
+
+
+def session_data(puzzle: list, waves: bool, step_index: int = -1) -> dict:
+    sudoku = methods.SudokuManager(puzzle, waves)
+    sudoku.logic_solve()
+    return {
+        "puzzle": sudoku.puzzle,
+        "board": sudoku.puzzle,
+        "steps": sudoku.steps.to_list(),
+        "step_index": step_index,
+        "stream": None,
+    }
+
+
+def replayed(data: dict, applied: int) -> list:
+    board = methods.ReversibleBoard(data["puzzle"])
+    board.seek(data["steps"], applied)
+    return board.board
+
+
+class RenderCacheTest(unittest.TestCase):
+    def test_evicts_least_recently_used(self):
+        views = cache.RenderCache(max_bytes=30)
+        for key in "abc":
+            views.put(key, key.upper(), 10)
+        self.assertEqual(views.get("a"), "A")
+        views.put("d", "D", 10)
+        self.assertNotIn("b", views)
+        self.assertEqual([views.get(key) for key in "acd"], ["A", "C", "D"])
+        self.assertEqual(views.nbytes, 30)
+
+    def test_evicts_by_bytes(self):
+        views = cache.RenderCache(max_bytes=30)
+        views.put("a", "A", 10)
+        views.put("b", "B", 10)
+        views.put("c", "C", 25)
+        self.assertEqual([key in views for key in "abc"], [False, False, True])
+        self.assertEqual(views.nbytes, 25)
+
+    def test_replacing_a_view_recounts_its_bytes(self):
+        views = cache.RenderCache(max_bytes=30)
+        views.put("a", "A", 10)
+        views.put("a", "A2", 20)
+        self.assertEqual(views.get("a"), "A2")
+        self.assertEqual(views.nbytes, 20)
+
+    def test_skips_views_larger_than_the_cache(self):
+        views = cache.RenderCache(max_bytes=30)
+        views.put("a", "A", 10)
+        views.put("b", "B", 31)
+        self.assertNotIn("b", views)
+        self.assertEqual(views.get("a"), "A")
+        self.assertEqual(views.nbytes, 10)
+        views.put("a", "A2", 31)
+        self.assertNotIn("a", views)
+        self.assertEqual(views.nbytes, 0)
+
+
+class SharedBoardTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.puzzle, _ = solvable_puzzle(3, 0.4, random.Random(0))
+
+    def test_traces_with_different_steps_do_not_share_boards(self):
+        waves = session_data(self.puzzle, True, 0)
+        fills = session_data(self.puzzle, False, 0)
+        self.assertNotEqual(waves["steps"], fills["steps"])
+        self.assertNotEqual(main.trace_key(waves), main.trace_key(fills))
+        for data in (waves, fills, waves, fills):
+            board = main.apply_steps(dict(data), False)["board"]
+            self.assertEqual(board, replayed(data, 1))
+
+    def test_failed_seek_drops_the_board(self):
+        data = session_data(self.puzzle, False)
+        key = main.trace_key(data)
+        main.apply_steps({**data, "step_index": 2}, False)
+        self.assertIn(key, main.trace_boards)
+        broken = {**data, "steps": [*data["steps"]]}
+        broken["steps"][4] = {**broken["steps"][4], "type": "fill", "position": 99}
+        with self.assertRaises(Exception):
+            main.apply_steps({**broken, "step_index": 6}, False)
+        self.assertNotIn(main.trace_key(broken), main.trace_boards)
+        board = main.apply_steps({**data, "step_index": 6}, False)["board"]
+        self.assertEqual(board, replayed(data, 7))
+
+    def test_step_index_past_the_end_resets(self):
+        data = session_data(self.puzzle, False)
+        result = main.apply_steps({**data, "step_index": len(data["steps"])}, True)
+        self.assertEqual(result["step_index"], -1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+import json
+import random
+import unittest
+import main
+import methods
+from puzzles import minimal_puzzle, solvable_puzzle
+
+
+class WaveTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        rng = random.Random(0)
+        cls.puzzles = [minimal_puzzle(3, rng) for _ in range(10)]
+        cls.puzzles += [solvable_puzzle(box, 0.4, rng) for box in (2, 4)]
+        cls.traces = []
+        for puzzle, _ in cls.puzzles:
+            sudoku = methods.SudokuManager(puzzle, waves=True)
+            sudoku.logic_solve()
+            steps = sudoku.steps.to_list()
+            waves = [i for i, step in enumerate(steps) if step["type"] == "wave"]
+            if waves:
+                cls.traces.append((sudoku, steps, waves[0]))
+
+    def test_waves_fill_the_solution(self):
+        for puzzle, solution in self.puzzles:
+            sudoku = methods.SudokuManager(puzzle, waves=True)
+            sudoku.logic_solve()
+            for step in sudoku.steps:
+                if step["type"] == "wave":
+                    for (y, x), digit in zip(step["positions"], step["digits"]):
+                        self.assertEqual(digit, solution[y][x])
+            for row, solved_row in zip(sudoku.board, solution):
+                for cell, digit in zip(row, solved_row):
+                    self.assertIn(digit, cell if isinstance(cell, list) else [cell])
+
+    def test_seek_restores_puzzle(self):
+        rng = random.Random(1)
+        for puzzle, _ in self.puzzles:
+            sudoku = methods.SudokuManager(puzzle, waves=True)
+            sudoku.logic_solve()
+            steps = sudoku.steps.to_list()
+            board = methods.ReversibleBoard(sudoku.puzzle)
+            for applied in rng.sample(range(len(steps) + 1), min(5, len(steps) + 1)):
+                board.seek(steps, applied, partial=rng.random() < 0.5)
+                fresh = methods.ReversibleBoard(sudoku.puzzle)
+                fresh.seek(steps, applied, partial=board._partial)
+                self.assertEqual(board.board, fresh.board)
+            board.seek(steps, len(steps))
+            self.assertEqual(board.board, sudoku.board)
+            board.seek(steps, 0)
+            self.assertEqual(board.board, sudoku.puzzle)
+
+    def test_expanded_wave_replays_to_the_same_board(self):
+        self.assertGreater(len(self.traces), len(self.puzzles) // 2)
+        for sudoku, steps, index in self.traces:
+            board = methods.ReversibleBoard(sudoku.puzzle)
+            board.seek(steps, index)
+            fills = methods.expand_wave(board.board, steps[index])
+            expanded = steps[:index] + fills + steps[index + 1 :]
+            self.assertEqual(len(fills), len(steps[index]["positions"]))
+            board.seek(steps, index + 1)
+            after_wave = [[cell for cell in row] for row in board.board]
+            replay = methods.ReversibleBoard(sudoku.puzzle)
+            replay.seek(expanded, index + len(fills))
+            self.assertEqual(replay.board, after_wave)
+            replay.seek(expanded, len(expanded))
+            self.assertEqual(replay.board, sudoku.board)
+
+    def test_expand_button_splits_the_wave(self):
+        sudoku, steps, index = self.traces[0]
+        data = {
+            "puzzle": sudoku.puzzle,
+            "board": sudoku.puzzle,
+            "steps": steps,
+            "step_index": index,
+            "stream": None,
+        }
+        main.apply_steps(dict(data), False)
+        inputs = [
+            ("new-btn", "n_clicks", None),
+            ("jump-to-start-btn", "n_clicks", None),
+            ("previous-btn", "n_clicks", None),
+            ("next-btn", "n_clicks", None),
+            ("jump-to-end-btn", "n_clicks", None),
+            ("expand-btn", "n_clicks", 1),
+            ("step-index-slider", "value", index + 1),
+        ]
+        outputs = [
+            ("sudoku-data", "data"),
+            ("step-index-slider", "min"),
+            ("step-index-slider", "max"),
+            ("step-index-slider", "value"),
+        ]
+        response = main.server.test_client().post(
+            "/_dash-update-component",
+            json={
+                "output": ".."
+                + "...".join(f"{id}.{prop}" for id, prop in outputs)
+                + "..",
+                "outputs": [{"id": id, "property": prop} for id, prop in outputs],
+                "inputs": [
+                    {"id": id, "property": prop, "value": value}
+                    for id, prop, value in inputs
+                ],
+                "state": [{"id": "sudoku-data", "property": "data", "value": data}],
+                "changedPropIds": ["expand-btn.n_clicks"],
+            },
+        )
+        self.assertEqual(response.status_code, 200)
+        props = response.json["response"]
+        expanded = props["sudoku-data"]["data"]["steps"]
+        wave = steps[index]
+        self.assertEqual(len(expanded), len(steps) + len(wave["positions"]) - 1)
+        self.assertEqual(props["step-index-slider"]["value"], index + 1)
+        fills = expanded[index : index + len(wave["positions"])]
+        self.assertEqual(
+            [(tuple(step["position"]), step["digit"]) for step in fills],
+            list(zip(map(tuple, wave["positions"]), wave["digits"])),
+        )
+        board = methods.ReversibleBoard(sudoku.puzzle)
+        board.seek(steps, index)
+        self.assertEqual(
+            fills, json.loads(json.dumps(methods.expand_wave(board.board, wave)))
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,180 @@
+from collections import deque
+from functools import wraps
+import os
+import threading
+import time
+
+RING_SIZE = int(os.environ.get("SUDOKU_TRACE_RING_SIZE", "2048"))
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class Series:
+    __slots__ = (
+        "durations",
+        "sizes",
+        "duration_count",
+        "duration_sum",
+        "size_count",
+        "size_sum",
+    )
+
+    def __init__(self, size: int):
+        self.durations: deque[float] = deque(maxlen=size)
+        self.sizes: deque[int] = deque(maxlen=size)
+        self.duration_count = 0
+        self.duration_sum = 0.0
+        self.size_count = 0
+        self.size_sum = 0
+
+    def copy(self) -> "Series":
+        series = Series(self.durations.maxlen)
+        series.durations.extend(self.durations)
+        series.sizes.extend(self.sizes)
+        series.duration_count = self.duration_count
+        series.duration_sum = self.duration_sum
+        series.size_count = self.size_count
+        series.size_sum = self.size_sum
+        return series
+
+
+class Recorder:
+    """Keeps the most recent span durations and payload sizes per
+    (kind, name) in fixed-size ring buffers, and the counters."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.series: dict[tuple[str, str], Series] = {}
+        self.counters: dict[str, int] = {}
+        self.captured: list[tuple[str, str, float, int | None]] | None = None
+        self.captured_counts: dict[str, int] | None = None
+        self._lock = threading.Lock()
+
+    def record(self, kind: str, name: str, duration: float, size: int | None):
+        with self._lock:
+            series = self.series.get((kind, name))
+            if series is None:
+                series = self.series[(kind, name)] = Series(self.size)
+            series.durations.append(duration)
+            series.duration_count += 1
+            series.duration_sum += duration
+            if size is not None:
+                series.sizes.append(size)
+                series.size_count += 1
+                series.size_sum += size
+            if self.captured is not None:
+                self.captured.append((kind, name, duration, size))
+
+    def count(self, name: str, amount: int = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+            if self.captured_counts is not None:
+                self.captured_counts[name] = self.captured_counts.get(name, 0) + amount
+
+    def snapshot(self) -> tuple[dict[tuple[str, str], Series], dict[str, int]]:
+        """Copies of the series and the counters, taken under the lock."""
+        with self._lock:
+            series = {key: value.copy() for key, value in self.series.items()}
+            return series, dict(self.counters)
+
+
+recorder = Recorder(RING_SIZE)
+counters = recorder.counters
+
+
+def count(name: str, amount: int = 1):
+    recorder.count(name, amount)
+
+
+class capture:
+    """Collects the spans and counter increments recorded in the block, on
+    top of recording them, so a worker process can hand them to its parent
+    to `replay`. Captures do not nest."""
+
+    def __enter__(self) -> "capture":
+        with recorder._lock:
+            self.spans = recorder.captured = []
+            self.counts = recorder.captured_counts = {}
+        return self
+
+    def __exit__(self, *exc_info):
+        with recorder._lock:
+            recorder.captured = recorder.captured_counts = None
+
+
+def replay(spans: list[tuple[str, str, float, int | None]], counts: dict[str, int]):
+    for span_args in spans:
+        recorder.record(*span_args)
+    for name, amount in counts.items():
+        recorder.count(name, amount)
+
+
+class span:
+    __slots__ = ("kind", "name", "size", "start")
+
+    def __init__(self, kind: str, name: str, size: int | None = None):
+        self.kind = kind
+        self.name = name
+        self.size = size
+
+    def __enter__(self) -> "span":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        recorder.record(
+            self.kind, self.name, time.perf_counter() - self.start, self.size
+        )
+
+
+def traced(kind: str, name: str | None = None, size=None):
+    def decorator(function):
+        span_name = name or function.__name__
+
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                recorder.record(
+                    kind,
+                    span_name,
+                    time.perf_counter() - start,
+                    None if size is None else size(),
+                )
+
+        return wrapper
+
+    return decorator
+
+
+def render_metrics() -> str:
+    series_by_key, counter_values = recorder.snapshot()
+    lines = []
+    for metric, help_text, attribute, prefix in (
+        (
+            "sudoku_span_duration_seconds",
+            "Span duration in seconds.",
+            "durations",
+            "duration",
+        ),
+        ("sudoku_span_payload_size", "Span payload size.", "sizes", "size"),
+    ):
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} summary")
+        for (kind, name), series in sorted(series_by_key.items()):
+            samples = sorted(getattr(series, attribute))
+            if len(samples) == 0:
+                continue
+            labels = f'kind="{kind}",name="{name}"'
+            for quantile in QUANTILES:
+                value = samples[min(len(samples) - 1, int(quantile * len(samples)))]
+                lines.append(f'{metric}{{{labels},quantile="{quantile}"}} {value:.9g}')
+            total = getattr(series, f"{prefix}_sum")
+            count = getattr(series, f"{prefix}_count")
+            lines.append(f"{metric}_sum{{{labels}}} {total:.9g}")
+            lines.append(f"{metric}_count{{{labels}}} {count}")
+    for name, value in sorted(counter_values.items()):
+        lines.append(f"# TYPE {name} counter")
+        lines.append(f"{name} {value}")
+    return "\n".join(lines) + "\n"
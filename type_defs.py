@@ -21,7 +21,14 @@ class ReduceStep(TypedDict):
     candidates_removed_positions: list[tuple[int, int]]
 
 
-Step = FillStep | ReduceStep
+class WaveStep(TypedDict):
+    type: Literal["wave"]
+    name: str
+    positions: list[tuple[int, int]]
+    digits: list[int]
+
+
+Step = FillStep | ReduceStep | WaveStep
 
 
 class SudokuData(TypedDict):
@@ -29,3 +36,4 @@ class SudokuData(TypedDict):
     puzzle: Board
     steps: list[Step]
     step_index: int
+    stream: str | None